@@ -1,4 +1,6 @@
 """Initialize app package"""
 from flask_jwt_extended import JWTManager
+from flask_sqlalchemy import SQLAlchemy
 
 jwt = JWTManager()
+db = SQLAlchemy()
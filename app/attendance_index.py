@@ -0,0 +1,103 @@
+"""
+Attendance query indexes
+Per subject sheet: row positions sorted by Date (so a date range is two bisects)
+and row positions per Student ID. Like the aggregates, they follow the cached
+sheet, taking in appended rows and rebuilding only after a full re-read.
+"""
+import bisect
+import threading
+from datetime import datetime
+
+# Formats the Date column may come back in (USER_ENTERED dates can be re-rendered)
+DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%Y', '%Y/%m/%d')
+
+
+def date_key(value):
+    """ISO YYYY-MM-DD form of a sheet date, or '' when it cannot be read"""
+    text = str(value or '').strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text[:10], fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return ''
+
+
+class SubjectIndex:
+    """Date-sorted and per-student positions into one subject sheet's records"""
+
+    def __init__(self, records):
+        self.records = records
+        self.consumed = 0
+        self.dates = []         # sorted ISO dates ...
+        self.positions = []     # ... and the record position for each
+        self.by_student = {}    # Student ID -> positions in row order
+        self.extend()
+
+    def extend(self):
+        """Index rows appended to the records list since the last call"""
+        end = len(self.records)
+        for position in range(self.consumed, end):
+            record = self.records[position]
+            key = date_key(record.get('Date'))
+            if key:
+                # Rows are mostly appended in date order, so this is usually an append
+                at = bisect.bisect_right(self.dates, key)
+                self.dates.insert(at, key)
+                self.positions.insert(at, position)
+            student_id = str(record.get('Student ID', '')).strip()
+            self.by_student.setdefault(student_id, []).append(position)
+        self.consumed = end
+
+    def candidates(self, student_id=None, date_from=None, date_to=None):
+        """Record positions that can match, from whichever index narrows the most"""
+        ranged = date_from is not None or date_to is not None
+        if ranged:
+            lo = bisect.bisect_left(self.dates, date_from) if date_from else 0
+            hi = bisect.bisect_right(self.dates, date_to) if date_to else len(self.dates)
+        if student_id is not None:
+            rows = self.by_student.get(student_id, [])
+            if not ranged or len(rows) <= hi - lo:
+                return rows
+        if ranged:
+            return sorted(self.positions[lo:hi])
+        return range(self.consumed)
+
+
+class AttendanceIndex:
+    """SubjectIndex per subject, kept in step with the cached subject sheets"""
+
+    def __init__(self):
+        self._subjects = {}
+        self._lock = threading.Lock()
+
+    def matches(self, subject, records, student_id=None, date_from=None, date_to=None, status=None):
+        """Positions of the matching records, in sheet row order"""
+        student_id = str(student_id).strip() if student_id is not None else None
+        status = status.lower() if status else None
+        with self._lock:
+            index = self._subjects.get(subject)
+            if index is None or index.records is not records or index.consumed > len(records):
+                index = self._subjects[subject] = SubjectIndex(records)
+            else:
+                index.extend()
+            positions = list(index.candidates(student_id, date_from, date_to))
+
+        matches = []
+        for position in positions:
+            record = records[position]
+            if student_id is not None and str(record.get('Student ID', '')).strip() != student_id:
+                continue
+            if status and str(record.get('Status', '')).strip().lower() != status:
+                continue
+            if date_from or date_to:
+                key = date_key(record.get('Date'))
+                if not key or (date_from and key < date_from) or (date_to and key > date_to):
+                    continue
+            matches.append(position)
+        return matches
+
+    def query(self, subject, records, student_id=None, date_from=None, date_to=None, status=None):
+        """Copies of the matching records (with Subject added), in sheet row order"""
+        return [dict(records[position], Subject=subject) for position in
+                self.matches(subject, records, student_id, date_from, date_to, status)]
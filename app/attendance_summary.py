@@ -0,0 +1,88 @@
+"""
+Attendance aggregates
+Present/absent/late counts per (Student ID, subject), kept in step with the
+cached subject sheets: rows appended since the last look are folded in, and a
+subject is recounted only when its sheet was re-read in full.
+"""
+import threading
+
+from app.attendance_index import date_key
+
+STATUSES = ('present', 'absent', 'late')
+
+
+def _empty_counts():
+    return {'present': 0, 'absent': 0, 'late': 0, 'other': 0, 'last_date': ''}
+
+
+def summary_row(student_id, subject, counts):
+    """Public shape of one aggregate; late counts as attended in the percentage"""
+    total = counts['present'] + counts['absent'] + counts['late'] + counts['other']
+    attended = counts['present'] + counts['late']
+    return {
+        'student_id': student_id,
+        'subject': subject,
+        'present': counts['present'],
+        'absent': counts['absent'],
+        'late': counts['late'],
+        'total': total,
+        'last_date': counts['last_date'],
+        'percentage': round(attended * 100 / total, 1) if total else 0.0
+    }
+
+
+class AttendanceSummary:
+    """Aggregates per subject sheet, folded incrementally as its cached rows grow"""
+
+    def __init__(self):
+        # subject -> {'records': cached list it was built from, 'consumed': rows counted,
+        #             'counts': {student_id: counts}}
+        self._subjects = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _fold(counts_by_student, records):
+        for record in records:
+            student_id = str(record.get('Student ID', '')).strip()
+            if not student_id:
+                continue
+            counts = counts_by_student.get(student_id)
+            if counts is None:
+                counts = counts_by_student[student_id] = _empty_counts()
+            status = str(record.get('Status', '')).strip().lower()
+            counts[status if status in STATUSES else 'other'] += 1
+            # Compared as ISO dates: sheets mix formats (2024-03-05, 3/5/2024, ...)
+            date = date_key(record.get('Date'))
+            if date > counts['last_date']:
+                counts['last_date'] = date
+
+    def sync(self, subject, records):
+        """Bring one subject up to date with its cached records list"""
+        with self._lock:
+            state = self._subjects.get(subject)
+            if state is None or state['records'] is not records or state['consumed'] > len(records):
+                # New list means the sheet was re-read in full - recount it
+                state = {'records': records, 'consumed': 0, 'counts': {}}
+                self._subjects[subject] = state
+            # Rows are only ever appended to a cached list, so only the tail is new
+            end = len(records)
+            self._fold(state['counts'], records[state['consumed']:end])
+            state['consumed'] = end
+
+    def rows(self, subjects, student_id=None):
+        """Aggregates for the given subjects, optionally for one student"""
+        student_id = str(student_id).strip() if student_id is not None else None
+        rows = []
+        with self._lock:
+            for subject in subjects:
+                state = self._subjects.get(subject)
+                if state is None:
+                    continue
+                if student_id is not None:
+                    counts = state['counts'].get(student_id)
+                    if counts is not None:
+                        rows.append(summary_row(student_id, subject, counts))
+                    continue
+                for sid in sorted(state['counts']):
+                    rows.append(summary_row(sid, subject, state['counts'][sid]))
+        return rows
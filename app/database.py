@@ -0,0 +1,162 @@
+"""
+Managed database connection
+Keeps one storage backend instance per worker process instead of one per request
+"""
+import os
+import atexit
+import functools
+import threading
+import time
+
+from app.google_sheets_db import GoogleSheetsDB, SERVICE_ACCOUNT_FILE
+
+_lock = threading.Lock()
+_state = {
+    'factory': GoogleSheetsDB,  # Callable that builds the backend selected in create_app
+    'db': None,           # Shared backend instance
+    'pid': None,          # Process that created it (gunicorn forks workers)
+    'fingerprint': None,  # Credentials/spreadsheet the instance was built from
+    'checked_at': 0.0     # Last time the fingerprint was re-checked
+}
+
+# How often (seconds) to check whether credentials or the spreadsheet changed
+RECYCLE_CHECK_SECONDS = float(os.getenv('SHEETS_RECYCLE_CHECK_SECONDS', '30'))
+# How long a replaced instance stays open for requests that already hold it
+RECYCLE_GRACE_SECONDS = float(os.getenv('SHEETS_RECYCLE_GRACE_SECONDS', '60'))
+
+# (instance, pid) replaced by a recycle and still waiting to be closed
+_retired = []
+
+
+def _connection_fingerprint():
+    """Describe the credentials and spreadsheet a connection is built from"""
+    try:
+        creds_mtime = os.path.getmtime(SERVICE_ACCOUNT_FILE)
+    except OSError:
+        creds_mtime = None
+    return (
+        os.getenv('GOOGLE_SHEETS_CREDS'),
+        os.getenv('GOOGLE_SHEETS_ID', 'EDUFACE Database'),
+        creds_mtime
+    )
+
+
+def _is_current(now):
+    """Check whether the shared instance can be reused by this process"""
+    if _state['db'] is None or _state['pid'] != os.getpid():
+        return False
+    if now - _state['checked_at'] < RECYCLE_CHECK_SECONDS:
+        return True
+    _state['checked_at'] = now
+    return _state['fingerprint'] == _connection_fingerprint()
+
+
+def _sheets_backend(app):
+    return GoogleSheetsDB()
+
+
+def _memory_backend(app):
+    from app.memory_db import InMemorySheetsDB
+    return InMemorySheetsDB.from_env()
+
+
+def _sql_backend(app):
+    from app.sql_db import SQLAlchemyDB
+    return SQLAlchemyDB(app)
+
+
+# STORAGE_BACKEND name -> factory(app)
+BACKENDS = {
+    'sheets': _sheets_backend,
+    'memory': _memory_backend,
+    'sql': _sql_backend
+}
+
+
+def _close_retired(entry):
+    with _lock:
+        if entry not in _retired:
+            return
+        _retired.remove(entry)
+    entry[0].close()
+
+
+def _retire(db):
+    """Close a replaced instance once requests that picked it up before the recycle are done"""
+    entry = (db, os.getpid())
+    with _lock:
+        _retired.append(entry)
+    timer = threading.Timer(RECYCLE_GRACE_SECONDS, _close_retired, args=(entry,))
+    timer.daemon = True
+    timer.start()
+
+
+def get_db():
+    """Return the shared storage backend for this worker, connecting on first use"""
+    now = time.monotonic()
+    if _is_current(now):
+        return _state['db']
+
+    with _lock:
+        # Another thread may have connected while we waited for the lock
+        fingerprint = _connection_fingerprint()
+        old_db = _state['db'] if _state['pid'] == os.getpid() else None
+        if old_db is not None and _state['fingerprint'] == fingerprint:
+            _state['checked_at'] = now
+            return old_db
+
+        print(f"[DEBUG] Opening shared storage connection for worker {os.getpid()}")
+        db = _state['factory']()
+        try:
+            db.warm_up()
+        except Exception as e:
+            print(f"[ERROR] Storage warm-up failed: {e}")
+        _state.update(db=db, pid=os.getpid(), fingerprint=fingerprint, checked_at=now)
+
+    if old_db is not None:
+        print("[DEBUG] Credentials or spreadsheet changed - recycled storage connection")
+        _retire(old_db)
+    return db
+
+
+def recycle_db():
+    """Drop the shared instance so the next get_db() reconnects"""
+    with _lock:
+        db = _state['db'] if _state['pid'] == os.getpid() else None
+        _state.update(db=None, pid=None, fingerprint=None, checked_at=0.0)
+    if db is not None:
+        _retire(db)
+
+
+def close_db():
+    """Shutdown hook - release the connection held by this worker and any it replaced"""
+    with _lock:
+        db = _state['db'] if _state['pid'] == os.getpid() else None
+        _state.update(db=None, pid=None, fingerprint=None, checked_at=0.0)
+        pending = [old_db for old_db, pid in _retired if pid == os.getpid()]
+        del _retired[:]
+    for old_db in pending + ([db] if db is not None else []):
+        old_db.close()
+
+
+# Registered once per interpreter, however many apps create_app() builds
+atexit.register(close_db)
+
+
+def init_app(app):
+    """Wire the shared connection into the Flask app lifecycle"""
+    global RECYCLE_CHECK_SECONDS, RECYCLE_GRACE_SECONDS
+    RECYCLE_CHECK_SECONDS = float(app.config.get('SHEETS_RECYCLE_CHECK_SECONDS', RECYCLE_CHECK_SECONDS))
+    RECYCLE_GRACE_SECONDS = float(app.config.get('SHEETS_RECYCLE_GRACE_SECONDS', RECYCLE_GRACE_SECONDS))
+    
+    backend = app.config.get('STORAGE_BACKEND', 'sheets')
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown STORAGE_BACKEND '{backend}'. Choose one of: {', '.join(BACKENDS)}")
+    if backend == 'sql':
+        # Flask-SQLAlchemy has to be registered before the app serves requests
+        from app import db
+        db.init_app(app)
+    recycle_db()
+    _state['factory'] = functools.partial(BACKENDS[backend], app)
+    
+    app.extensions['sheets_db'] = get_db
@@ -0,0 +1,63 @@
+"""
+Streaming CSV / NDJSON exports
+Rows are serialized as they come out of a backend iterator and sent with
+chunked transfer encoding, so memory stays flat however many rows there are.
+"""
+import csv
+import io
+import json
+
+from flask import Response, stream_with_context
+
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+# Rows serialized per chunk written to the socket
+ROWS_PER_CHUNK = 500
+
+
+def _csv_chunks(rows, fields):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore')
+    writer.writeheader()
+    # The header goes out before the first sheet read, so clients see bytes immediately
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % ROWS_PER_CHUNK == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _ndjson_chunks(rows, fields):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({field: row.get(field, '') for field in fields}, default=str))
+        if len(lines) >= ROWS_PER_CHUNK:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def export_response(rows, fields, fmt, filename):
+    """Streaming response of `rows` (an iterator of dicts) as CSV or NDJSON"""
+    chunks = _csv_chunks(rows, fields) if fmt == 'csv' else _ndjson_chunks(rows, fields)
+
+    def generate():
+        try:
+            yield from chunks
+        except Exception as e:
+            # Headers are already sent, so the client sees a truncated body
+            print(f"[ERROR] Export of {filename} failed mid-stream: {e}")
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename={filename}.{fmt}'}
+    )
@@ -3,51 +3,90 @@ Google Sheets Database Wrapper
 Handles all database operations using Google Sheets as persistent storage
 """
 import gspread
+from gspread.utils import absolute_range_name, numericise_all, rowcol_to_a1
 from google.oauth2.service_account import Credentials
 import os
 import json
+import threading
+import time
 from datetime import datetime
+from app.storage import StorageBackend
+from app.quota_scheduler import ScheduledClient
+from app.sheet_catalog import WorksheetCatalog
+from app.sheets_cache import TableCache
+from app.single_flight import SingleFlight
+from app.user_index import UserIndex
+from app.attendance_index import AttendanceIndex
+from app.attendance_summary import AttendanceSummary
+from app.id_allocator import IdAllocator
+from app.pagination import IdOrder, encode_cursor
+from app.results_analytics import ResultsAnalytics
+from app.timetable import Timetable, day_name
+from app.write_behind import WriteBehindQueue, first_appended_row
 
-class GoogleSheetsDB:
-    def __init__(self):
-        """Initialize Google Sheets connection"""
+# Local credentials file used when GOOGLE_SHEETS_CREDS is not set
+SERVICE_ACCOUNT_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'service_account.json'
+)
+
+# SQLite file holding the row ID sequences shared by all workers on this host
+DEFAULT_ID_SEQUENCE_DB = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'id_sequences.db'
+)
+
+class GoogleSheetsDB(StorageBackend):
+    def __init__(self, spreadsheet=None):
+        """Initialize Google Sheets connection (or wrap an already-open spreadsheet)"""
+        super().__init__()
         self.scopes = ['https://www.googleapis.com/auth/spreadsheets', 
                        'https://www.googleapis.com/auth/drive']
         
-        # Try to load credentials from environment variable (Render production)
-        creds_json_str = os.getenv('GOOGLE_SHEETS_CREDS')
+        # Read-through cache of worksheet records, invalidated by our own writes
+        self.cache = TableCache(
+            ttl=float(os.getenv('SHEETS_CACHE_TTL', '30')),
+            max_bytes=int(os.getenv('SHEETS_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+        )
+        self._user_index = None
+        self._index_lock = threading.Lock()
+        self._headers = {}  # worksheet title -> header row
+        # Concurrent misses on the same sheet share one fetch, keyed by (title, cache version)
+        self.flights = SingleFlight()
+        # Per-student, per-subject attendance counts derived from the cached subject sheets
+        self.attendance_summary = AttendanceSummary()
+        self.attendance_index = AttendanceIndex()
+        self._id_orders = {}  # worksheet title -> IdOrder, for cursor pagination
+        self._timetable = None  # Timetable for the cached Routines sheet
+        self._results_analytics = None  # ResultsAnalytics for the cached Results sheet
         
-        if creds_json_str:
-            # Production: Use environment variable
-            creds_dict = json.loads(creds_json_str)
-            credentials = Credentials.from_service_account_info(creds_dict, scopes=self.scopes)
-        else:
-            # Development: Use local service_account.json
-            # Look for the file in the backend folder (parent of app folder)
-            backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            creds_file = os.path.join(backend_dir, 'service_account.json')
-            
-            if not os.path.exists(creds_file):
-                raise FileNotFoundError(
-                    f"service_account.json not found at {creds_file}. "
-                    "Please copy it from the root folder or set GOOGLE_SHEETS_CREDS environment variable."
-                )
-            
-            credentials = Credentials.from_service_account_file(
-                creds_file,
-                scopes=self.scopes
+        # Expired sheets are revalidated against the spreadsheet's Drive modifiedTime and
+        # refreshed with a tail read; a full re-read is still forced every FULL_REFRESH seconds
+        # to pick up edits made in the middle of a sheet outside this app
+        self.full_refresh_seconds = float(os.getenv('SHEETS_FULL_REFRESH_SECONDS', '300'))
+        self._modified = None
+        self._modified_checked_at = float('-inf')
+        self._modified_lock = threading.Lock()
+        
+        # Row IDs come from a host-wide sequence instead of len(records) + 1
+        self.ids = self._create_id_allocator()
+        
+        # Optional write-behind mode: coalesce concurrent appends per worksheet
+        self.write_behind = None
+        if os.getenv('SHEETS_WRITE_BEHIND', 'false').lower() in ('1', 'true', 'yes'):
+            self.write_behind = WriteBehindQueue(
+                flush_interval=float(os.getenv('SHEETS_WRITE_BEHIND_MS', '200')) / 1000,
+                max_rows=int(os.getenv('SHEETS_WRITE_BEHIND_ROWS', '50'))
             )
         
-        self.client = gspread.authorize(credentials)
+        if spreadsheet is None:
+            # All API calls are metered and retried by the shared quota scheduler
+            self.client = gspread.authorize(self._load_credentials(), client_factory=ScheduledClient)
+            self.spreadsheet = self._open_spreadsheet()
+        else:
+            self.client = getattr(spreadsheet, 'client', None)
+            self.spreadsheet = spreadsheet
         
-        # Get the spreadsheet (you'll need to create this and set GOOGLE_SHEETS_ID env var)
-        spreadsheet_id = os.getenv('GOOGLE_SHEETS_ID', 'EDUFACE Database')
-        print(f"[DEBUG] Attempting to open spreadsheet: '{spreadsheet_id}'")
-        try:
-            self.spreadsheet = self.client.open(spreadsheet_id)
-            print(f"[DEBUG] Successfully opened spreadsheet")
-        except gspread.exceptions.SpreadsheetNotFound:
-            raise Exception(f"Google Sheet '{spreadsheet_id}' not found. Create it first!")
+        # Worksheet handles, listed in one metadata call instead of one per lookup
+        self.sheets = WorksheetCatalog(self.spreadsheet)
         
         # Get worksheets - Handle both singular and plural names
         self.users_sheet = self._get_worksheet('Users', 'User')
@@ -62,35 +101,457 @@ class GoogleSheetsDB:
         
         self.results_sheet = self._get_worksheet('Results', 'Result')
     
+    def _create_id_allocator(self):
+        return IdAllocator(
+            path=os.getenv('ID_SEQUENCE_DB', DEFAULT_ID_SEQUENCE_DB),
+            block_size=int(os.getenv('ID_BLOCK_SIZE', '1'))
+        )
+    
+    def _load_credentials(self):
+        """Load service account credentials from the environment or service_account.json"""
+        # Try to load credentials from environment variable (Render production)
+        creds_json_str = os.getenv('GOOGLE_SHEETS_CREDS')
+        
+        if creds_json_str:
+            # Production: Use environment variable
+            creds_dict = json.loads(creds_json_str)
+            return Credentials.from_service_account_info(creds_dict, scopes=self.scopes)
+        
+        # Development: Use local service_account.json
+        # Look for the file in the backend folder (parent of app folder)
+        creds_file = SERVICE_ACCOUNT_FILE
+        
+        if not os.path.exists(creds_file):
+            raise FileNotFoundError(
+                f"service_account.json not found at {creds_file}. "
+                "Please copy it from the root folder or set GOOGLE_SHEETS_CREDS environment variable."
+            )
+        
+        return Credentials.from_service_account_file(
+            creds_file,
+            scopes=self.scopes
+        )
+    
+    def _open_spreadsheet(self):
+        """Open the spreadsheet named by GOOGLE_SHEETS_ID"""
+        # Get the spreadsheet (you'll need to create this and set GOOGLE_SHEETS_ID env var)
+        spreadsheet_id = os.getenv('GOOGLE_SHEETS_ID', 'EDUFACE Database')
+        print(f"[DEBUG] Attempting to open spreadsheet: '{spreadsheet_id}'")
+        try:
+            spreadsheet = self.client.open(spreadsheet_id)
+            print(f"[DEBUG] Successfully opened spreadsheet")
+            return spreadsheet
+        except gspread.exceptions.SpreadsheetNotFound:
+            raise Exception(f"Google Sheet '{spreadsheet_id}' not found. Create it first!")
+    
     def _get_worksheet(self, *names):
         """Get worksheet by trying multiple possible names"""
-        for name in names:
+        worksheet = self.sheets.find(*names)
+        if worksheet is None:
+            raise Exception(f"Could not find sheet with any of these names: {names}")
+        return worksheet
+    
+    def _cached_records(self, worksheet, fresh=False):
+        """Return (shared records list, version) for a worksheet, reading it on a miss"""
+        key = worksheet.title
+        if fresh:
+            records = worksheet.get_all_records()
+            return records, self.cache.put(key, records)
+        records, version = self.cache.lookup(key)
+        if records is None:
+            # The version is part of the key so a read that started before one of
+            # our own writes is never shared with a caller that made the write
+            records, version = self.flights.do((key, version), lambda: self._load_records(worksheet))
+        return records, version
+    
+    def _load_records(self, worksheet):
+        """Refresh an expired sheet, or read it in full; returns (records, version)"""
+        key = worksheet.title
+        records, version = self._revalidate(key)
+        if records is None:
+            records = worksheet.get_all_records()
+            version = self.cache.put(key, records)
+        return records, version
+    
+    # Drive modifiedTime is fetched at most this often, shared by all sheets
+    CHANGE_CHECK_SECONDS = 2
+    
+    def _spreadsheet_modified(self):
+        """Drive modifiedTime of the spreadsheet (None when unknown)"""
+        with self._modified_lock:
+            now = time.monotonic()
+            if now - self._modified_checked_at >= self.CHANGE_CHECK_SECONDS:
+                try:
+                    self.spreadsheet.refresh_lastUpdateTime()
+                    self._modified = self.spreadsheet.lastUpdateTime
+                except Exception as e:
+                    print(f"[DEBUG] Could not read spreadsheet modifiedTime: {e}")
+                    self._modified = None
+                self._modified_checked_at = now
+            return self._modified
+    
+    def _stale_entry(self, title):
+        """Expired cache entry that may be refreshed incrementally, or None for a full read"""
+        stale = self.cache.stale(title)
+        if stale is None or not stale['length']:
+            return None
+        if time.monotonic() - stale['loaded_at'] > self.full_refresh_seconds:
+            return None
+        return stale
+    
+    @staticmethod
+    def _tail_range(title, stale):
+        """A1 range from the last cached row to the end of the sheet"""
+        length = stale['length']
+        # Header is row 1, so the last cached record lives on row length + 1
+        last_column = rowcol_to_a1(1, len(stale['records'][length - 1])).rstrip('0123456789')
+        return absolute_range_name(title, f"A{length + 1}:{last_column}")
+    
+    def _apply_tail(self, title, stale, values, modified):
+        """Extend a stale entry with rows read after its last row.
+
+        The first row read must still match the last cached record; otherwise rows were
+        edited or deleted and None is returned so the caller does a full read.
+        """
+        records = stale['records']
+        anchor = records[stale['length'] - 1]
+        headers = list(anchor.keys())
+        if not values or self._row_to_record(headers, values[0]) != anchor:
+            return None, None
+        new_records = [self._row_to_record(headers, row) for row in values[1:]]
+        if new_records:
+            version = self.cache.extend(title, stale['version'], stale['length'], new_records, modified)
+        else:
+            version = self.cache.touch(title, stale['version'], modified)
+        return (records, version) if version is not None else (None, None)
+    
+    def _revalidate(self, title):
+        """Refresh an expired sheet without a full download when possible.
+
+        Returns (records, version), or (None, None) when a full read is needed.
+        """
+        stale = self._stale_entry(title)
+        if stale is None:
+            return None, None
+        modified = self._spreadsheet_modified()
+        if modified is not None and modified == stale['modified']:
+            version = self.cache.touch(title, stale['version'])
+            return (stale['records'], version) if version is not None else (None, None)
+        try:
+            response = self.spreadsheet.values_get(self._tail_range(title, stale))
+        except Exception as e:
+            print(f"[DEBUG] Tail read of '{title}' failed ({e}) - reading the whole sheet")
+            return None, None
+        return self._apply_tail(title, stale, response.get('values', []), modified)
+    
+    def _read_records(self, worksheet, fresh=False):
+        """Get worksheet records through the cache (fresh=True forces a re-read)"""
+        records, _ = self._cached_records(worksheet, fresh)
+        # Callers annotate the dicts they get back, so hand out copies
+        return [dict(record) for record in records]
+    
+    def _read_many(self, titles):
+        """Return {title: shared records} for several worksheets, fetching all misses in one batchGet.
+
+        Sheets another thread is already fetching are waited for instead of read again.
+        """
+        found = {}
+        leading = {}
+        following = {}
+        for title in titles:
+            records, version = self.cache.lookup(title)
+            if records is not None:
+                found[title] = records
+                continue
+            if self.sheets.find(title) is None:
+                # A missing sheet would fail the whole batch
+                continue
+            key = (title, version)
+            future, leader = self.flights.begin(key)
+            (leading if leader else following)[title] = (key, future)
+        
+        if leading:
             try:
-                return self.spreadsheet.worksheet(name)
-            except:
+                fetched = self._fetch_many(list(leading))
+            except BaseException as e:
+                for key, future in leading.values():
+                    self.flights.finish(key, future, error=e)
+                raise
+            for title, (key, future) in leading.items():
+                self.flights.finish(key, future, fetched.get(title))
+                if title in fetched:
+                    found[title] = fetched[title][0]
+        
+        for title, (key, future) in following.items():
+            try:
+                result = future.result()
+            except Exception:
                 continue
-        raise Exception(f"Could not find sheet with any of these names: {names}")
+            if result is not None:
+                found[title] = result[0]
+        return found
+    
+    def _fetch_many(self, titles):
+        """Load expired/missing sheets in one batchGet; returns {title: (records, version)}.
+
+        Expired sheets ride in the same batchGet as tail reads, or need no read at all
+        when the spreadsheet has not been modified since they were last checked.
+        """
+        found = {}
+        missing = list(titles)
+        stale_entries = {}
+        for title in titles:
+            stale = self._stale_entry(title)
+            if stale is not None:
+                stale_entries[title] = stale
+        
+        modified = self._spreadsheet_modified() if stale_entries else None
+        for title, stale in list(stale_entries.items()):
+            if modified is not None and modified == stale['modified']:
+                version = self.cache.touch(title, stale['version'])
+                if version is not None:
+                    found[title] = (stale['records'], version)
+                    missing.remove(title)
+                del stale_entries[title]
+        
+        if missing:
+            try:
+                ranges = [
+                    self._tail_range(title, stale_entries[title]) if title in stale_entries
+                    else absolute_range_name(title)
+                    for title in missing
+                ]
+                response = self.spreadsheet.values_batch_get(ranges)
+                retry = []
+                for title, value_range in zip(missing, response.get('valueRanges', [])):
+                    values = value_range.get('values', [])
+                    if title in stale_entries:
+                        records, version = self._apply_tail(title, stale_entries[title], values, modified)
+                        if records is None:
+                            retry.append(title)
+                        else:
+                            found[title] = (records, version)
+                        continue
+                    records = self._values_to_records(values)
+                    found[title] = (records, self.cache.put(title, records))
+                if retry:
+                    # Tail no longer lines up with the cached rows - re-read those sheets in full
+                    response = self.spreadsheet.values_batch_get(
+                        [absolute_range_name(title) for title in retry]
+                    )
+                    for title, value_range in zip(retry, response.get('valueRanges', [])):
+                        records = self._values_to_records(value_range.get('values', []))
+                        found[title] = (records, self.cache.put(title, records))
+            except gspread.exceptions.APIError as e:
+                # e.g. a sheet renamed since the worksheet list was loaded - fall back to one read per sheet
+                print(f"[DEBUG] Batch read failed ({e}) - reading sheets one by one")
+                for title in missing:
+                    if title in found:
+                        continue
+                    try:
+                        # Not through _cached_records: this thread already leads the flight
+                        found[title] = self._load_records(self._worksheet_by_title(title))
+                    except Exception:
+                        continue
+        return found
+    
+    def _worksheet_by_title(self, title):
+        """Resolve a worksheet title from the metadata cache (raises WorksheetNotFound)"""
+        return self.sheets.get(title)
+    
+    @classmethod
+    def _values_to_records(cls, values):
+        """Turn raw sheet values (header row first) into get_all_records()-style dicts"""
+        if not values:
+            return []
+        headers = values[0]
+        return [cls._row_to_record(headers, row) for row in values[1:]]
+    
+    @staticmethod
+    def _row_to_record(headers, row):
+        """Build the dict get_all_records() would return for a row we just wrote"""
+        values = [str(value) for value in row][:len(headers)]
+        values += [''] * (len(headers) - len(values))
+        return dict(zip(headers, numericise_all(values)))
+    
+    def _users(self):
+        """Return the UserIndex for the current version of the Users sheet"""
+        records, version = self._cached_records(self.users_sheet)
+        with self._index_lock:
+            index = self._user_index
+            if index is None or index.version != version:
+                index = UserIndex(records, version)
+                self._user_index = index
+            return index
+    
+    def _write_through_user(self, record, position=None, sheet_row=None):
+        """Apply a user row we just wrote to the cached sheet and its index: an update of
+        the record at position, or an append the sheet reported at sheet_row"""
+        key = self.users_sheet.title
+        # A tail read picks up appended rows but not a row changed in place
+        updated = position is not None
+        with self._index_lock:
+            records, version = self.cache.lookup(key)
+            if records is None:
+                self._invalidate(self.users_sheet, hard=updated)
+                return
+            old_record = records[position] if updated and position < len(records) else None
+            if updated:
+                applied = self.cache.replace(key, position, record)
+            else:
+                # Only applied when the row landed right after the cached ones; if another
+                # worker appended in between, the next read picks up both rows from the sheet
+                position = sheet_row - 2 if sheet_row is not None else None
+                applied = position is not None and self.cache.append(key, record, position=position)
+            if not applied:
+                self._invalidate(self.users_sheet, hard=updated)
+                return
+            index = self._user_index
+            if index is None or index.version != version:
+                # Rebuilt from the cached records on next lookup, no sheet read needed
+                self._user_index = None
+            elif old_record is None:
+                index.add(record, position)
+            else:
+                index.replace(old_record, record, position)
+    
+    def _header_row(self, worksheet):
+        """Header row of a worksheet, read once and then served from memory"""
+        title = worksheet.title
+        headers = self._headers.get(title)
+        if headers is None:
+            # Writers finishing together (e.g. one write-behind flush) share a single read
+            headers = self.flights.do(
+                ('headers', title),
+                lambda: self._headers.setdefault(title, worksheet.row_values(1))
+            )
+        return headers
+    
+    def _row_has_id(self, worksheet, row, record_id):
+        """True if the ID cell of a sheet row holds record_id (one single-cell read)"""
+        headers = self._header_row(worksheet)
+        column = headers.index('ID') + 1 if 'ID' in headers else 1
+        response = self.spreadsheet.values_get(
+            absolute_range_name(worksheet.title, rowcol_to_a1(row, column))
+        )
+        values = response.get('values') or [[]]
+        return bool(values[0]) and str(values[0][0]).strip() == str(record_id).strip()
+    
+    def _max_id(self, worksheet):
+        """Highest ID in a worksheet (served from the cache when it is warm)"""
+        records, _ = self._cached_records(worksheet)
+        ids = [int(r['ID']) for r in records if str(r.get('ID', '')).strip().lstrip('-').isdigit()]
+        return max(ids, default=0)
+    
+    def _id_page(self, worksheet, limit, after=None, predicate=None, transform=dict):
+        """One page of a sheet in ID order, copying only the rows served; returns (items, next_cursor)"""
+        records, version = self._cached_records(worksheet)
+        with self._index_lock:
+            order = self._id_orders.get(worksheet.title)
+            if order is None or not order.matches(records, version):
+                order = IdOrder(records, version)
+                self._id_orders[worksheet.title] = order
+        return order.page(records, limit, after, predicate, transform)
+    
+    def _next_id(self, worksheet):
+        """Allocate a new row ID without reading the sheet on every insert"""
+        name = f"{getattr(self.spreadsheet, 'id', '')}:{worksheet.title}"
+        return self.ids.next_id(name, lambda: self._max_id(worksheet))
+    
+    def _append_row(self, worksheet, row):
+        """Append one row, through the write-behind queue when enabled; returns its sheet row"""
+        if self.write_behind is not None:
+            return self.write_behind.submit(worksheet, row).result(timeout=60)
+        return first_appended_row(worksheet.append_row(row))
+    
+    def _invalidate(self, worksheet, hard=False):
+        """Expire cached records after writing to a worksheet.
+
+        Appends keep the cached rows so the next read only fetches the new tail;
+        hard=True drops them (rows were deleted or moved).
+        """
+        if hard:
+            self.cache.invalidate(worksheet.title)
+        else:
+            self.cache.expire(worksheet.title)
+    
+    def warm_up(self):
+        """Load the subject sheets and build the attendance aggregates before serving requests"""
+        self.get_attendance_summary()
+    
+    # Rows per ranged read when streaming an uncached sheet
+    EXPORT_CHUNK_ROWS = int(os.getenv('SHEETS_EXPORT_CHUNK_ROWS', '1000'))
+    
+    def _iter_sheet(self, worksheet):
+        """Yield a worksheet's records: from the cache when it is current, otherwise
+        EXPORT_CHUNK_ROWS rows per ranged read, without caching the whole sheet"""
+        records, _ = self.cache.lookup(worksheet.title)
+        if records is not None:
+            # Rows are only appended to a cached list, so a slice is a stable snapshot
+            for record in records[:len(records)]:
+                yield dict(record)
+            return
+        headers = self._header_row(worksheet)
+        last_column = rowcol_to_a1(1, len(headers)).rstrip('0123456789')
+        start = 2
+        while True:
+            end = start + self.EXPORT_CHUNK_ROWS - 1
+            response = self.spreadsheet.values_get(
+                absolute_range_name(worksheet.title, f"A{start}:{last_column}{end}")
+            )
+            values = response.get('values', [])
+            # Trailing blank rows are trimmed from a range, so only an empty one means the end
+            if not values:
+                return
+            for row in values:
+                if any(str(value).strip() for value in row):
+                    yield self._row_to_record(headers, row)
+            start = end + 1
+    
+    def cache_stats(self):
+        """Cache hit/miss counters, plus how many reads were shared with an in-flight fetch"""
+        stats = self.cache.stats()
+        stats['single_flight'] = self.flights.stats()
+        return stats
+    
+    def close(self):
+        """Flush queued writes and release the HTTP session held by the gspread client"""
+        if self.write_behind is not None:
+            self.write_behind.close()
+        super().close()
+        session = getattr(self.client, 'session', None) if self.client else None
+        if session is not None:
+            session.close()
     
     # ==================== USER OPERATIONS ====================
     
     def get_all_users(self):
         """Get all users from Google Sheets"""
         try:
-            records = self.users_sheet.get_all_records()
+            records = self._read_records(self.users_sheet)
             # Return as-is to preserve all fields
             return records
         except Exception as e:
             print(f"[ERROR] Failed to get users: {e}")
             return []
     
+    def get_users_page(self, limit, cursor=None):
+        """One page of users in ID order; returns (users, next_cursor)"""
+        return self._id_page(self.users_sheet, limit, cursor)
+    
+    def _find_user(self, find):
+        """Look a user up in the index; on a miss revalidate the Users sheet once, since
+        the user may have been added by another worker after this one cached it"""
+        record = find(self._users())
+        if record is None:
+            self._invalidate(self.users_sheet)
+            record = find(self._users())
+        return dict(record) if record else None
+    
     def find_user_by_email(self, email):
         """Find user by email"""
         try:
-            records = self.users_sheet.get_all_records()
-            for record in records:
-                if record.get('Email', '').lower() == email.lower():
-                    return record
-            return None
+            return self._find_user(lambda users: users.find_by_email(email))
         except Exception as e:
             print(f"[ERROR] Failed to find user by email: {e}")
             return None
@@ -98,21 +559,25 @@ class GoogleSheetsDB:
     def find_user_by_id(self, user_id):
         """Find user by ID"""
         try:
-            records = self.users_sheet.get_all_records()
-            for record in records:
-                if str(record.get('ID', '')).strip() == str(user_id).strip():
-                    return record
-            return None
+            record = self._users().find_by_id(user_id)
+            return dict(record) if record else None
         except Exception as e:
             print(f"[ERROR] Failed to find user by ID: {e}")
             return None
     
+    def find_user_by_student_id(self, student_id):
+        """Find user by Student ID"""
+        try:
+            return self._find_user(lambda users: users.find_by_student_id(student_id))
+        except Exception as e:
+            print(f"[ERROR] Failed to find user by Student ID: {e}")
+            return None
+    
     def add_user(self, user_data):
         """Add a new user to Google Sheets"""
         try:
             # Get next ID
-            records = self.users_sheet.get_all_records()
-            next_id = len(records) + 1
+            next_id = self._next_id(self.users_sheet)
             
             # Prepare row
             row = [
@@ -128,7 +593,8 @@ class GoogleSheetsDB:
                 datetime.now().isoformat()  # created_at
             ]
             
-            self.users_sheet.append_row(row)
+            sheet_row = self._append_row(self.users_sheet, row)
+            self._write_through_user(self._row_to_record(self._header_row(self.users_sheet), row), sheet_row=sheet_row)
             
             # Return the added user
             return {
@@ -145,35 +611,91 @@ class GoogleSheetsDB:
             print(f"[ERROR] Failed to add user: {e}")
             return None
     
-    def update_user(self, user_id, update_data):
-        """Update user profile fields"""
+    def add_users_bulk(self, users_data):
+        """Add many users with one append_rows call"""
         try:
-            # Get all records with row numbers
-            records = self.users_sheet.get_all_records()
+            rows = [
+                [
+                    self._next_id(self.users_sheet),
+                    user_data.get('name', ''),
+                    user_data.get('email', ''),
+                    user_data.get('password', ''),
+                    user_data.get('student_id', ''),
+                    user_data.get('phone', ''),
+                    user_data.get('role', 'student'),
+                    user_data.get('section', ''),
+                    'true',  # is_active
+                    datetime.now().isoformat()  # created_at
+                ]
+                for user_data in users_data
+            ]
+            sheet_row = first_appended_row(self.users_sheet.append_rows(rows))
+            headers = self._header_row(self.users_sheet)
+            for offset, row in enumerate(rows):
+                self._write_through_user(
+                    self._row_to_record(headers, row),
+                    sheet_row=sheet_row + offset if sheet_row is not None else None
+                )
             
-            # Find the row number for this user
-            user_row = None
-            for idx, record in enumerate(records, start=2):  # Start at 2 because row 1 is headers
-                if record.get('ID') == user_id:
-                    user_row = idx
+            return [
+                {
+                    'id': row[0],
+                    'name': user_data.get('name'),
+                    'email': user_data.get('email'),
+                    'student_id': user_data.get('student_id'),
+                    'phone': user_data.get('phone'),
+                    'role': user_data.get('role', 'student'),
+                    'section': user_data.get('section'),
+                    'is_active': True
+                }
+                for row, user_data in zip(rows, users_data)
+            ]
+        except Exception as e:
+            print(f"[ERROR] Failed to add {len(users_data)} users: {e}")
+            return None
+    
+    def update_user(self, user_id, update_data):
+        """Update user profile fields with one batch_update; returns the updated record"""
+        try:
+            # Locate the row through the user index, then make sure the sheet row really
+            # holds this user before writing: the cached order can lag behind rows other
+            # workers appended, and a wrong row here would overwrite someone else's account
+            for attempt in range(2):
+                users = self._users()
+                position = users.position_of(user_id)
+                
+                if position is None:
+                    print(f"[ERROR] User with ID {user_id} not found")
+                    return False
+                user_row = position + 2  # +2 because row 1 is headers
+                if self._row_has_id(self.users_sheet, user_row, user_id):
                     break
-            
-            if not user_row:
-                print(f"[ERROR] User with ID {user_id} not found")
+                print(f"[DEBUG] Row {user_row} does not hold user {user_id} - re-reading Users")
+                self._invalidate(self.users_sheet, hard=True)
+            else:
+                print(f"[ERROR] Could not locate the row of user {user_id}")
                 return False
+            record = dict(users.find_by_id(user_id))
             
-            # Get header row to find column indices
-            headers = self.users_sheet.row_values(1)
-            
-            # Update each field that was provided
+            # Map the provided fields to their cells using the cached header row
+            headers = self._header_row(self.users_sheet)
+            updates = []
             for field_name, field_value in update_data.items():
                 if field_name in headers:
                     col_idx = headers.index(field_name) + 1  # gspread uses 1-based indexing
-                    self.users_sheet.update_cell(user_row, col_idx, field_value)
-                    print(f"[DEBUG] Updated {field_name} for user {user_id}")
+                    updates.append({
+                        'range': rowcol_to_a1(user_row, col_idx),
+                        'values': [[field_value]]
+                    })
+                    record[field_name] = numericise_all([str(field_value)])[0]
+            
+            if updates:
+                self.users_sheet.batch_update(updates, value_input_option='USER_ENTERED')
+                print(f"[DEBUG] Updated {', '.join(update_data)} for user {user_id}")
+            self._write_through_user(record, position)
             
             print(f"[DEBUG] User {user_id} profile updated successfully")
-            return True
+            return record
         except Exception as e:
             print(f"[ERROR] Failed to update user: {e}")
             import traceback
@@ -182,26 +704,29 @@ class GoogleSheetsDB:
     
     # ==================== ROUTINE OPERATIONS ====================
     
+    @staticmethod
+    def _routine_record(record):
+        """Routine row with field names normalized to lowercase (handles both column name formats)"""
+        return {
+            'id': record.get('ID', record.get('id', '')),
+            'user_id': record.get('User ID', record.get('user_id', '')),
+            'day': record.get('day', ''),
+            'start_time': record.get('start_time', ''),
+            'end_time': record.get('end_time', ''),
+            'subject': record.get('subject', ''),
+            'instructor_name': record.get('instructor_name', ''),
+            'room_number': record.get('room_number', '')
+        }
+    
     def get_all_routines(self):
         """Get all routines"""
         try:
-            records = self.routines_sheet.get_all_records()
+            records = self._read_records(self.routines_sheet)
             
             # Normalize field names to lowercase for consistent API responses
             normalized = []
             for record in records:
-                # Handle both possible column name formats
-                normalized_record = {
-                    'id': record.get('ID', record.get('id', '')),
-                    'user_id': record.get('User ID', record.get('user_id', '')),
-                    'day': record.get('day', ''),
-                    'start_time': record.get('start_time', ''),
-                    'end_time': record.get('end_time', ''),
-                    'subject': record.get('subject', ''),
-                    'instructor_name': record.get('instructor_name', ''),
-                    'room_number': record.get('room_number', '')
-                }
-                normalized.append(normalized_record)
+                normalized.append(self._routine_record(record))
             return normalized
         except Exception as e:
             print(f"[ERROR] Failed to get routines: {e}")
@@ -209,25 +734,34 @@ class GoogleSheetsDB:
             traceback.print_exc()
             return []
     
+    def get_routines_page(self, limit, cursor=None, day=None):
+        """One page of routines in ID order, optionally for one day; returns (routines, next_cursor)"""
+        predicate = None
+        if day:
+            # Same normalization as the unpaged ?day= ('mon' matches 'Monday')
+            day = day_name(day)
+            predicate = lambda r: day is not None and day_name(r.get('day')) == day
+        return self._id_page(self.routines_sheet, limit, cursor, predicate, self._routine_record)
+    
+    def timetable(self):
+        """Timetable index for the cached Routines sheet, rebuilt only when the sheet changed"""
+        records, version = self._cached_records(self.routines_sheet)
+        with self._index_lock:
+            index = self._timetable
+            if index is None or index.version != (version, len(records)):
+                index = Timetable([self._routine_record(r) for r in records], (version, len(records)))
+                self._timetable = index
+            return index
+    
     def get_user_routines(self, user_id):
         """Get routines for a specific user"""
         try:
-            records = self.routines_sheet.get_all_records()
+            records = self._read_records(self.routines_sheet)
             # Normalize field names to lowercase
             normalized = []
             for record in records:
                 if str(record.get('User ID', '')) == str(user_id):
-                    normalized_record = {
-                        'id': record.get('ID', record.get('id', '')),
-                        'user_id': record.get('User ID', record.get('user_id', '')),
-                        'day': record.get('day', ''),
-                        'start_time': record.get('start_time', ''),
-                        'end_time': record.get('end_time', ''),
-                        'subject': record.get('subject', ''),
-                        'instructor_name': record.get('instructor_name', ''),
-                        'room_number': record.get('room_number', '')
-                    }
-                    normalized.append(normalized_record)
+                    normalized.append(self._routine_record(record))
             return normalized
         except Exception as e:
             print(f"[ERROR] Failed to get user routines: {e}")
@@ -236,8 +770,7 @@ class GoogleSheetsDB:
     def add_routine(self, routine_data):
         """Add a new routine"""
         try:
-            records = self.routines_sheet.get_all_records()
-            next_id = len(records) + 1
+            next_id = self._next_id(self.routines_sheet)
             
             row = [
                 next_id,  # ID
@@ -251,7 +784,11 @@ class GoogleSheetsDB:
                 datetime.now().isoformat()
             ]
             
-            self.routines_sheet.append_row(row)
+            sheet_row = self._append_row(self.routines_sheet, row)
+            record = self._row_to_record(self._header_row(self.routines_sheet), row)
+            # Keep the cached sheet current so the timetable is rebuilt from memory
+            if sheet_row is None or not self.cache.append(self.routines_sheet.title, record, position=sheet_row - 2):
+                self._invalidate(self.routines_sheet)
             
             return {
                 'id': next_id,
@@ -270,11 +807,12 @@ class GoogleSheetsDB:
     def delete_routine(self, routine_id):
         """Delete a routine by ID"""
         try:
-            records = self.routines_sheet.get_all_records()
+            records = self._read_records(self.routines_sheet, fresh=True)
             for idx, record in enumerate(records):
                 if str(record.get('ID', '')) == str(routine_id):
                     # Delete the row (row index + 2 because of header row)
                     self.routines_sheet.delete_rows(idx + 2, idx + 2)
+                    self._invalidate(self.routines_sheet, hard=True)
                     return True
             return False
         except Exception as e:
@@ -286,52 +824,97 @@ class GoogleSheetsDB:
     def get_all_attendance(self):
         """Get all attendance records"""
         try:
-            records = self.attendance_sheet.get_all_records()
+            records = self._read_records(self.attendance_sheet)
             return records
         except Exception as e:
             print(f"[ERROR] Failed to get attendance: {e}")
             return []
     
+    def get_attendance_page(self, limit, cursor=None, subject=None):
+        """One page of the Attendance sheet in ID order; returns (records, next_cursor)"""
+        if self.attendance_sheet is None:
+            return [], None
+        predicate = None
+        if subject:
+            predicate = lambda r: str(r.get('Subject', '')).lower() == subject.lower()
+        return self._id_page(self.attendance_sheet, limit, cursor, predicate)
+    
     def get_user_attendance(self, user_id):
         """Get attendance records for a specific user from all subject sheets"""
         try:
-            all_attendance = []
+            # Resolve the user's Student ID once, from the user index
+            user = self._users().find_by_id(user_id)
+            student_id = user.get('Student ID') if user else None
+            if not student_id:
+                return []
             
-            # Define subject sheets
-            subjects = ['Chemistry', 'Math', 'Physics', 'English']
-            
-            for subject in subjects:
-                try:
-                    worksheet = self.spreadsheet.worksheet(subject)
-                    records = worksheet.get_all_records()
-                    
-                    # Get student's record from this subject
-                    student_id = None
-                    users = self.get_all_users()
-                    for user in users:
-                        if user.get('ID') == user_id:
-                            student_id = user.get('Student ID')
-                            break
-                    
-                    if student_id:
-                        subject_records = [r for r in records if str(r.get('Student ID', '')) == str(student_id)]
-                        # Add subject info to each record
-                        for record in subject_records:
-                            record['Subject'] = subject
-                        all_attendance.extend(subject_records)
-                except:
-                    continue
-            
-            return all_attendance
+            # All subject sheets in one batchGet, rows picked from the per-student index
+            return self.query_attendance(student_id=student_id)
         except Exception as e:
             print(f"[ERROR] Failed to get user attendance: {e}")
             return []
     
+    def query_attendance(self, student_id=None, subject=None, date_from=None, date_to=None, status=None):
+        """Subject-sheet attendance matching the filters (dates as YYYY-MM-DD, inclusive).
+
+        Filters are evaluated on per-subject date and Student ID indexes, so a one-week
+        query only touches that week's rows.
+        """
+        try:
+            subjects = self._attendance_titles(subject)
+            sheets = self._read_many(subjects)
+            
+            records = []
+            for title in subjects:
+                if title in sheets:
+                    records.extend(self.attendance_index.query(
+                        title, sheets[title], student_id, date_from, date_to, status
+                    ))
+            return records
+        except Exception as e:
+            print(f"[ERROR] Failed to query attendance: {e}")
+            return []
+    
+    def query_attendance_page(self, limit, cursor=None, subject=None, **filters):
+        """One page of query_attendance() results; the cursor is [subject, last row position served]"""
+        subjects = self._attendance_titles(subject)
+        start, after = 0, -1
+        if cursor is not None:
+            if len(cursor) != 2 or cursor[0] not in subjects or not isinstance(cursor[1], int):
+                raise ValueError('Invalid cursor')
+            start, after = subjects.index(cursor[0]), cursor[1]
+        try:
+            sheets = self._read_many(subjects[start:])
+            items, last = [], None
+            for title in subjects[start:]:
+                if title not in sheets:
+                    continue
+                records = sheets[title]
+                for position in self.attendance_index.matches(title, records, **filters):
+                    # Rows are only appended, so positions already served never move
+                    if title == subjects[start] and position <= after:
+                        continue
+                    if len(items) == limit:
+                        return items, encode_cursor(last)
+                    items.append(dict(records[position], Subject=title))
+                    last = [title, position]
+            return items, None
+        except Exception as e:
+            print(f"[ERROR] Failed to query attendance page: {e}")
+            return [], None
+    
+    def _attendance_titles(self, subject=None):
+        """Subject sheets to read for an optional ?subject= filter"""
+        if subject:
+            # Same case-insensitive subject match the API has always applied
+            return [s for s in self.ATTENDANCE_SUBJECTS if s.lower() == subject.lower()] or [subject]
+        return list(self.ATTENDANCE_SUBJECTS)
+    
     def get_attendance_by_subject(self, subject):
         """Get all attendance records for a specific subject"""
         try:
-            worksheet = self.spreadsheet.worksheet(subject)
-            records = worksheet.get_all_records()
+            worksheet = self._worksheet_by_title(subject)
+            records = self._read_records(worksheet)
             
             # Add subject info to each record
             for record in records:
@@ -344,22 +927,17 @@ class GoogleSheetsDB:
     
     def get_all_attendance_subjects(self):
         """Get all available subject sheets"""
-        subjects = ['Chemistry', 'Math', 'Physics', 'English']
-        available = []
-        
-        for subject in subjects:
-            try:
-                self.spreadsheet.worksheet(subject)
-                available.append(subject)
-            except:
-                continue
-        
-        return available
+        try:
+            titles = set(self.sheets.titles())
+        except Exception as e:
+            print(f"[ERROR] Failed to list worksheets: {e}")
+            return []
+        return [subject for subject in self.ATTENDANCE_SUBJECTS if subject in titles]
     
     def add_attendance_to_subject(self, subject, attendance_data):
         """Add attendance record to a specific subject sheet"""
         try:
-            worksheet = self.spreadsheet.worksheet(subject)
+            worksheet = self._worksheet_by_title(subject)
             
             row = [
                 attendance_data.get('student_id', ''),
@@ -367,7 +945,12 @@ class GoogleSheetsDB:
                 attendance_data.get('status', 'Absent')
             ]
             
-            worksheet.append_row(row)
+            sheet_row = self._append_row(worksheet, row)
+            record = self._row_to_record(self._header_row(worksheet), row)
+            # Keep the cached sheet (and the aggregates folded from it) current without
+            # a re-read, unless someone else appended in between
+            if sheet_row is None or not self.cache.append(worksheet.title, record, position=sheet_row - 2):
+                self._invalidate(worksheet)
             
             return {
                 'subject': subject,
@@ -379,8 +962,68 @@ class GoogleSheetsDB:
             print(f"[ERROR] Failed to add attendance to {subject}: {e}")
             return None
     
+    def iter_attendance(self, subject=None):
+        """Yield every subject sheet's records (with Subject added), one ranged chunk at a time"""
+        for title in self.get_all_attendance_subjects():
+            if subject and title.lower() != subject.lower():
+                continue
+            worksheet = self.sheets.find(title)
+            if worksheet is None:
+                continue
+            for record in self._iter_sheet(worksheet):
+                record['Subject'] = title
+                yield record
+    
+    def add_attendance_bulk(self, subject, date, entries):
+        """Mark a whole class session: students checked against one user index snapshot,
+        all rows written with a single append"""
+        users = self._users()
+        
+        def find_user(user_id, student_id):
+            return users.find_by_student_id(student_id) if student_id else users.find_by_id(user_id)
+        
+        outcomes, accepted = self._check_attendance_entries(entries, find_user)
+        if not accepted:
+            return outcomes
+        try:
+            worksheet = self._worksheet_by_title(subject)
+            rows = [[user['Student ID'], date, status] for _, user, status in accepted]
+            sheet_row = first_appended_row(worksheet.append_rows(rows))
+            headers = self._header_row(worksheet)
+            # Write the rows through to the cache, one position-checked append each
+            for offset, row in enumerate(rows):
+                if sheet_row is None or not self.cache.append(
+                        worksheet.title, self._row_to_record(headers, row), position=sheet_row - 2 + offset):
+                    self._invalidate(worksheet)
+                    break
+            for index, _, status in accepted:
+                outcomes[index].update(ok=True, status=status)
+        except Exception as e:
+            print(f"[ERROR] Failed to add bulk attendance to {subject}: {e}")
+            for index, _, _ in accepted:
+                outcomes[index]['error'] = 'Failed to write attendance'
+        return outcomes
+    
+    def get_attendance_summary(self, student_id=None, subject=None):
+        """Present/absent/late counts and percentage per (Student ID, subject)"""
+        try:
+            subjects = [subject] if subject else self.ATTENDANCE_SUBJECTS
+            sheets = self._read_many(subjects)
+            for title, records in sheets.items():
+                self.attendance_summary.sync(title, records)
+            return self.attendance_summary.rows([s for s in subjects if s in sheets], student_id)
+        except Exception as e:
+            print(f"[ERROR] Failed to get attendance summary: {e}")
+            return []
+    
     def add_attendance(self, attendance_data):
         """Add attendance record - tries subject sheet first, then old Attendance sheet"""
+        # Subject sheets are keyed by Student ID; the API sends the user's row ID
+        if not attendance_data.get('student_id') and attendance_data.get('user_id'):
+            user = self._users().find_by_id(attendance_data['user_id'])
+            if user and user.get('Student ID'):
+                attendance_data = dict(attendance_data, student_id=user['Student ID'])
+        
         # Try to add to subject sheet if available
         if 'subject' in attendance_data:
             result = self.add_attendance_to_subject(attendance_data['subject'], attendance_data)
@@ -390,8 +1033,7 @@ class GoogleSheetsDB:
         # Fallback to old Attendance sheet if it exists
         if self.attendance_sheet:
             try:
-                records = self.attendance_sheet.get_all_records()
-                next_id = len(records) + 1
+                next_id = self._next_id(self.attendance_sheet)
                 
                 row = [
                     next_id,  # ID
@@ -402,7 +1044,8 @@ class GoogleSheetsDB:
                     datetime.now().isoformat()
                 ]
                 
-                self.attendance_sheet.append_row(row)
+                self._append_row(self.attendance_sheet, row)
+                self._invalidate(self.attendance_sheet)
                 
                 return {
                     'id': next_id,
@@ -421,16 +1064,39 @@ class GoogleSheetsDB:
     def get_all_results(self):
         """Get all results"""
         try:
-            records = self.results_sheet.get_all_records()
+            records = self._read_records(self.results_sheet)
             return records
         except Exception as e:
             print(f"[ERROR] Failed to get results: {e}")
             return []
     
+    def get_results_page(self, limit, cursor=None, user_id=None):
+        """One page of results in ID order, optionally for one user; returns (results, next_cursor)"""
+        predicate = None
+        if user_id is not None:
+            predicate = lambda r: str(r.get('User ID', '')) == str(user_id)
+        return self._id_page(self.results_sheet, limit, cursor, predicate)
+    
+    def iter_results(self, user_id=None):
+        """Yield Results rows, one ranged chunk at a time"""
+        for record in self._iter_sheet(self.results_sheet):
+            if user_id is None or str(record.get('User ID', '')) == str(user_id):
+                yield record
+    
+    def results_analytics(self):
+        """ResultsAnalytics for the cached Results sheet, recomputed only when the sheet changed"""
+        records, version = self._cached_records(self.results_sheet)
+        with self._index_lock:
+            analytics = self._results_analytics
+            if analytics is None or analytics.version != (version, len(records)):
+                analytics = ResultsAnalytics(records, (version, len(records)))
+                self._results_analytics = analytics
+            return analytics
+    
     def get_user_results(self, user_id):
         """Get results for a specific user"""
         try:
-            records = self.results_sheet.get_all_records()
+            records = self._read_records(self.results_sheet)
             user_results = [r for r in records if str(r.get('User ID', '')) == str(user_id)]
             return user_results
         except Exception as e:
@@ -440,8 +1106,7 @@ class GoogleSheetsDB:
     def add_result(self, result_data):
         """Add result record"""
         try:
-            records = self.results_sheet.get_all_records()
-            next_id = len(records) + 1
+            next_id = self._next_id(self.results_sheet)
             
             row = [
                 next_id,  # ID
@@ -453,7 +1118,10 @@ class GoogleSheetsDB:
                 datetime.now().isoformat()
             ]
             
-            self.results_sheet.append_row(row)
+            sheet_row = self._append_row(self.results_sheet, row)
+            record = self._row_to_record(self._header_row(self.results_sheet), row)
+            if sheet_row is None or not self.cache.append(self.results_sheet.title, record, position=sheet_row - 2):
+                self._invalidate(self.results_sheet)
             
             return {
                 'id': next_id,
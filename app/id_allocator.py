@@ -0,0 +1,73 @@
+"""
+Collision-free ID allocation for sheet rows
+Hands out increasing IDs from a SQLite sequence table shared by every worker
+process on the host, so inserts no longer read the whole sheet to compute len(records) + 1.
+"""
+import os
+import sqlite3
+import threading
+
+
+class IdAllocator:
+    """Per-table sequences, reserved from SQLite in blocks of block_size IDs.
+
+    With path=None the sequences live only in this process (in-memory backend).
+    """
+
+    def __init__(self, path=None, block_size=1):
+        self.path = path
+        self.block_size = max(1, int(block_size))
+        self._blocks = {}   # name -> [next ID to hand out, last ID in the reserved block]
+        self._lock = threading.Lock()
+        self._local = {}    # name -> last reserved ID when running without a file
+        if path:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            conn = self._connect()
+            try:
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS sequences (name TEXT PRIMARY KEY, value INTEGER NOT NULL)'
+                )
+            finally:
+                conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def _reserve(self, name, floor):
+        """Reserve the next block above max(stored value, floor); returns (first, last)"""
+        if not self.path:
+            current = max(self._local.get(name, 0), floor)
+            self._local[name] = current + self.block_size
+            return current + 1, current + self.block_size
+
+        conn = self._connect()
+        try:
+            # IMMEDIATE takes the write lock up front, serializing workers on this host
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT value FROM sequences WHERE name = ?', (name,)).fetchone()
+            current = max(row[0] if row else 0, floor)
+            conn.execute(
+                'INSERT OR REPLACE INTO sequences (name, value) VALUES (?, ?)',
+                (name, current + self.block_size)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+        return current + 1, current + self.block_size
+
+    def next_id(self, name, floor_fn):
+        """Next ID for a table. floor_fn() returns the highest ID already in the table;
+        it is called once per process per table to catch rows added outside this app."""
+        with self._lock:
+            block = self._blocks.get(name)
+            if block is None or block[0] > block[1]:
+                floor = floor_fn() if block is None else 0
+                block = list(self._reserve(name, floor))
+                self._blocks[name] = block
+            next_id = block[0]
+            block[0] += 1
+            return next_id
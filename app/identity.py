@@ -0,0 +1,76 @@
+"""
+Request identity from JWT claims
+Access tokens carry the user's role, Student ID and a user-version claim, so
+authorization checks need no Users-sheet lookup. The full user row is fetched
+(at most once per request) only when a handler needs profile data.
+"""
+import hashlib
+
+from flask import g
+from flask_jwt_extended import get_jwt, get_jwt_identity
+
+from app.database import get_db
+
+
+def user_version(user):
+    """Fingerprint of the fields refresh tokens depend on: disabling the account makes
+    every outstanding refresh token stale. The password hash is left out because a
+    login rehashes it when PASSWORD_HASH_METHOD changes, which must not sign out the
+    user's other sessions; a password reset revokes tokens through revoke_user_tokens."""
+    raw = str(user.get('is_active', 'true')).lower()
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+def token_claims(user):
+    """additional_claims for the tokens issued to a user"""
+    return {
+        'role': user.get('Role', 'student'),
+        'student_id': str(user.get('Student ID', '') or ''),
+        'uv': user_version(user)
+    }
+
+
+class Identity:
+    """The caller of the current request, as described by its token"""
+
+    def __init__(self, user_id, claims):
+        self.user_id = user_id
+        self.claims = claims
+        self._user = None
+        self._loaded = False
+
+    @property
+    def user(self):
+        """Full user row (one lookup per request), or None if the user no longer exists"""
+        if not self._loaded:
+            self._user = get_db().find_user_by_id(self.user_id)
+            self._loaded = True
+        return self._user
+
+    @property
+    def role(self):
+        if 'role' in self.claims:
+            return self.claims['role']
+        # Tokens issued before claims were added: fall back to the user row
+        return self.user.get('Role', 'student') if self.user else None
+
+    @property
+    def student_id(self):
+        if 'student_id' in self.claims:
+            return self.claims['student_id'] or None
+        return self.user.get('Student ID') if self.user else None
+
+    @property
+    def is_admin(self):
+        return str(self.role or '').lower() == 'admin'
+
+
+def current_identity():
+    """Identity for the current request's token, or None when its subject is not a user ID"""
+    if not hasattr(g, '_identity'):
+        try:
+            user_id = int(str(get_jwt_identity()).strip())
+        except (TypeError, ValueError):
+            user_id = None
+        g._identity = Identity(user_id, get_jwt()) if user_id else None
+    return g._identity
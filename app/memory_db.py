@@ -0,0 +1,270 @@
+"""
+In-memory Google Sheets backend
+Drop-in replacement for GoogleSheetsDB for offline load testing and benchmarks.
+The spreadsheet/worksheet classes mimic the parts of gspread that GoogleSheetsDB uses,
+so every cache, index and batching path runs exactly as it does against real Sheets.
+"""
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+
+from gspread.exceptions import WorksheetNotFound
+from gspread.utils import a1_to_rowcol, numericise_all
+from werkzeug.security import generate_password_hash
+
+from app.google_sheets_db import GoogleSheetsDB
+from app.id_allocator import IdAllocator
+
+# Header rows, matching GOOGLE_SHEETS_SETUP.md and the columns GoogleSheetsDB reads/writes
+USERS_HEADERS = ['ID', 'Full Name', 'Email', 'Password', 'Student ID', 'Phone', 'Role',
+                 'Section', 'is_active', 'created_at', 'Parent Email']
+ROUTINES_HEADERS = ['ID', 'User ID', 'day', 'start_time', 'end_time', 'subject',
+                    'instructor_name', 'room_number', 'created_at']
+ATTENDANCE_HEADERS = ['ID', 'User ID', 'Subject', 'Status', 'Date', 'created_at']
+RESULTS_HEADERS = ['ID', 'User ID', 'Subject', 'Marks', 'Grade', 'Date', 'created_at']
+SUBJECT_HEADERS = ['Student ID', 'Date', 'Status']
+
+_SHEET_RANGE = re.compile(r"^'?(.*?)'?(?:!(.*))?$")
+
+
+class MemoryWorksheet:
+    """gspread.Worksheet stand-in holding its cells as lists of strings"""
+
+    def __init__(self, spreadsheet, title, sheet_id, rows=None):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.id = sheet_id
+        self.rows = [[str(value) for value in row] for row in (rows or [])]
+        self._lock = threading.Lock()
+
+    @property
+    def row_count(self):
+        return len(self.rows)
+
+    def get_all_values(self, **kwargs):
+        self.spreadsheet._api_call()
+        with self._lock:
+            return [list(row) for row in self.rows]
+
+    def get_all_records(self, **kwargs):
+        values = self.get_all_values()
+        if not values:
+            return []
+        headers = values[0]
+        records = []
+        for row in values[1:]:
+            row = row + [''] * (len(headers) - len(row))
+            records.append(dict(zip(headers, numericise_all(row))))
+        return records
+
+    def row_values(self, row, **kwargs):
+        self.spreadsheet._api_call()
+        with self._lock:
+            return list(self.rows[row - 1]) if row <= len(self.rows) else []
+
+    def append_row(self, values, **kwargs):
+        return self.append_rows([values], **kwargs)
+
+    def append_rows(self, values, **kwargs):
+        self.spreadsheet._api_call()
+        self.spreadsheet._mark_modified()
+        with self._lock:
+            first_row = len(self.rows) + 1
+            self.rows.extend([str(value) for value in row] for row in values)
+            last_row = len(self.rows)
+        return {'updates': {
+            'updatedRange': f"'{self.title}'!A{first_row}:Z{last_row}",
+            'updatedRows': len(values)
+        }}
+
+    def update_cell(self, row, col, value):
+        self.spreadsheet._api_call()
+        self.spreadsheet._mark_modified()
+        with self._lock:
+            self._set(row, col, value)
+
+    def batch_update(self, data, **kwargs):
+        self.spreadsheet._api_call()
+        self.spreadsheet._mark_modified()
+        with self._lock:
+            for item in data:
+                row, col = a1_to_rowcol(item['range'].split('!')[-1])
+                for r_offset, values in enumerate(item['values']):
+                    for c_offset, value in enumerate(values):
+                        self._set(row + r_offset, col + c_offset, value)
+
+    def delete_rows(self, start_index, end_index=None):
+        self.spreadsheet._api_call()
+        self.spreadsheet._mark_modified()
+        with self._lock:
+            del self.rows[start_index - 1:(end_index or start_index)]
+
+    def clear(self):
+        self.spreadsheet._api_call()
+        self.spreadsheet._mark_modified()
+        with self._lock:
+            self.rows = []
+
+    def _set(self, row, col, value):
+        while len(self.rows) < row:
+            self.rows.append([])
+        cells = self.rows[row - 1]
+        cells.extend([''] * (col - len(cells)))
+        cells[col - 1] = str(value)
+
+
+class MemorySpreadsheet:
+    """gspread.Spreadsheet stand-in; counts API calls and can simulate latency"""
+
+    client = None
+
+    def __init__(self, title='EDUFACE Database', latency=0.0):
+        self.id = 'memory'
+        self.title = title
+        self.latency = latency
+        self.calls = 0
+        self.revision = 0
+        self.lastUpdateTime = None
+        self._sheets = {}
+        self._lock = threading.Lock()
+
+    def _api_call(self):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _mark_modified(self):
+        with self._lock:
+            self.revision += 1
+
+    def refresh_lastUpdateTime(self):
+        # Drive reports a timestamp; a revision counter changes just the same way
+        self._api_call()
+        self.lastUpdateTime = str(self.revision)
+
+    def add_worksheet(self, title, rows=None, cols=None, index=None, headers=None):
+        self._api_call()
+        with self._lock:
+            worksheet = MemoryWorksheet(self, title, len(self._sheets), [headers] if headers else [])
+            self._sheets[title] = worksheet
+            return worksheet
+
+    def worksheet(self, title):
+        self._api_call()
+        try:
+            return self._sheets[title]
+        except KeyError:
+            raise WorksheetNotFound(title)
+
+    def worksheets(self, exclude_hidden=False):
+        self._api_call()
+        return list(self._sheets.values())
+
+    def values_get(self, range, params=None):
+        self._api_call()
+        return self._read_range(range)
+
+    def values_batch_get(self, ranges, params=None):
+        self._api_call()
+        return {'valueRanges': [self._read_range(sheet_range) for sheet_range in ranges]}
+
+    def _read_range(self, sheet_range):
+        title, cells = _SHEET_RANGE.match(sheet_range).groups()
+        worksheet = self._sheets.get(title)
+        if worksheet is None:
+            raise WorksheetNotFound(title)
+        # Only the rows of the range matter here; columns are returned whole
+        first_row, last_row = 1, None
+        if cells:
+            start, _, end = cells.partition(':')
+            first_row = a1_to_rowcol(start)[0]
+            if end and end[-1].isdigit():
+                last_row = a1_to_rowcol(end)[0]
+        with worksheet._lock:
+            values = [list(row) for row in worksheet.rows[first_row - 1:last_row]]
+        return {'range': sheet_range, 'values': values}
+
+
+def create_spreadsheet(subjects=None, latency=0.0):
+    """Empty spreadsheet with the standard EDUFACE sheets and header rows"""
+    spreadsheet = MemorySpreadsheet(latency=latency)
+    spreadsheet.add_worksheet('Users', headers=USERS_HEADERS)
+    spreadsheet.add_worksheet('Routines', headers=ROUTINES_HEADERS)
+    spreadsheet.add_worksheet('Attendance', headers=ATTENDANCE_HEADERS)
+    spreadsheet.add_worksheet('Results', headers=RESULTS_HEADERS)
+    for subject in subjects or GoogleSheetsDB.ATTENDANCE_SUBJECTS:
+        spreadsheet.add_worksheet(subject, headers=SUBJECT_HEADERS)
+    spreadsheet.calls = 0
+    return spreadsheet
+
+
+def seed_spreadsheet(spreadsheet, students=100, days=30, subjects=None, password='student123'):
+    """Fill a spreadsheet with an admin, students, routines, results and attendance"""
+    subjects = subjects or GoogleSheetsDB.ATTENDANCE_SUBJECTS
+    now = datetime.now()
+    created_at = now.isoformat()
+    # Hash once - hashing per seeded student would dominate start-up time
+    student_hash = generate_password_hash(password)
+    admin_hash = generate_password_hash(os.getenv('ADMIN_PASSWORD', 'admin123'))
+
+    users = spreadsheet._sheets['Users'].rows
+    users.append(['1', 'Admin', os.getenv('ADMIN_EMAIL', 'admin@eduface.com'), admin_hash,
+                  'ADMIN001', '', 'admin', '', 'true', created_at, ''])
+    for i in range(1, students + 1):
+        users.append([str(i + 1), f'Student {i}', f'student{i}@eduface.com', student_hash,
+                      f'STU{i:04d}', f'0170000{i:04d}', 'student', 'A' if i % 2 else 'B',
+                      'true', created_at, ''])
+
+    routines = spreadsheet._sheets['Routines'].rows
+    weekdays = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday']
+    for day_idx, day in enumerate(weekdays):
+        for slot, subject in enumerate(subjects):
+            start = 9 + slot
+            routines.append([str(len(routines)), '1', day, f'{start:02d}:00', f'{start + 1:02d}:00',
+                             subject, f'Instructor {slot + 1}', f'R{100 + slot}', created_at])
+
+    results = spreadsheet._sheets['Results'].rows
+    grades = [(80, 'A+'), (70, 'A'), (60, 'B'), (50, 'C'), (40, 'D'), (0, 'F')]
+    for i in range(1, students + 1):
+        for subject in subjects:
+            marks = random.randint(30, 100)
+            grade = next(g for cutoff, g in grades if marks >= cutoff)
+            results.append([str(len(results)), str(i + 1), subject, str(marks), grade,
+                            now.strftime('%Y-%m-%d'), created_at])
+
+    for subject in subjects:
+        rows = spreadsheet._sheets[subject].rows
+        for day_offset in range(days, 0, -1):
+            date = (now - timedelta(days=day_offset)).strftime('%Y-%m-%d')
+            for i in range(1, students + 1):
+                status = 'Present' if random.random() < 0.8 else 'Absent'
+                rows.append([f'STU{i:04d}', date, status])
+    return spreadsheet
+
+
+class InMemorySheetsDB(GoogleSheetsDB):
+    """GoogleSheetsDB running against an in-memory spreadsheet"""
+
+    def __init__(self, spreadsheet=None):
+        super().__init__(spreadsheet=spreadsheet or create_spreadsheet())
+    
+    def _create_id_allocator(self):
+        # Data lives only in this process, so the sequences do too
+        return IdAllocator(path=None)
+
+    @classmethod
+    def from_env(cls):
+        """Build a seeded instance sized by MEMORY_SEED_* environment variables"""
+        spreadsheet = create_spreadsheet(latency=float(os.getenv('MEMORY_SHEETS_LATENCY_MS', '0')) / 1000)
+        seed_spreadsheet(
+            spreadsheet,
+            students=int(os.getenv('MEMORY_SEED_STUDENTS', '100')),
+            days=int(os.getenv('MEMORY_SEED_DAYS', '30'))
+        )
+        spreadsheet.calls = 0
+        print(f"[DEBUG] Using in-memory spreadsheet with {len(spreadsheet._sheets['Users'].rows) - 1} users")
+        return cls(spreadsheet)
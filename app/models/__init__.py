@@ -12,12 +12,13 @@ class User(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     full_name = db.Column(db.String(255), nullable=False)
-    student_id = db.Column(db.String(50), unique=True, nullable=False)
-    email = db.Column(db.String(255), unique=True, nullable=False)
+    student_id = db.Column(db.String(50), unique=True, index=True, nullable=False)
+    email = db.Column(db.String(255), unique=True, index=True, nullable=False)
     parent_email = db.Column(db.String(255), nullable=True)
     contact_number = db.Column(db.String(20), nullable=True)
     password_hash = db.Column(db.String(255), nullable=False)
     role = db.Column(db.String(20), default='student')  # 'student' or 'admin'
+    section = db.Column(db.String(20), nullable=True)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -53,6 +54,7 @@ class Routine(db.Model):
     __tablename__ = 'routines'
     
     id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)  # Admin who created it
     subject = db.Column(db.String(100), nullable=False)
     day = db.Column(db.String(20), nullable=False)  # Monday, Tuesday, etc.
     start_time = db.Column(db.String(5), nullable=False)  # HH:MM format
@@ -81,6 +83,9 @@ class Routine(db.Model):
 class Attendance(db.Model):
     """Attendance record model"""
     __tablename__ = 'attendance'
+    __table_args__ = (
+        db.Index('ix_attendance_student_subject_date', 'student_id', 'subject', 'date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -114,6 +119,7 @@ class Result(db.Model):
     subject = db.Column(db.String(100), nullable=False)
     marks = db.Column(db.Integer, nullable=False)
     grade = db.Column(db.String(5), nullable=False)  # A+, A, B+, etc.
+    date = db.Column(db.Date, nullable=True)
     uploaded_by = db.Column(db.String(255), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,177 @@
+"""
+Password hashing off the request threads
+Hashes and checks run on a bounded process pool, so a login burst keeps the
+CPU-heavy key derivation out of the gunicorn worker and a full queue turns
+into a quick 503 instead of a pile-up. Hash parameters come from the
+environment; stored hashes made with other parameters are flagged for rehash.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+
+class HashingBusy(RuntimeError):
+    """Raised when the hashing queue stays full, or a hash is not done, within the timeout"""
+
+
+def canonical_method(method):
+    """Method string as Werkzeug writes it into a hash ('pbkdf2' -> 'pbkdf2:sha256:600000')"""
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        n, r, p = args if len(args) == 3 else (2 ** 15, 8, 1)
+        return f"scrypt:{int(n)}:{int(r)}:{int(p)}"
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{iterations}"
+    return method
+
+
+class PasswordHasher:
+    """Bounded process pool for generate_password_hash / check_password_hash.
+
+    workers=0 hashes on the calling thread (no pool), e.g. for scripts. By default the
+    CPUs are shared out between the WEB_CONCURRENCY gunicorn workers, each of which
+    has its own pool.
+    """
+
+    def __init__(self, workers=None, queue_limit=64, timeout=10.0, method='pbkdf2', salt_length=16):
+        if workers is None:
+            workers = max(1, (os.cpu_count() or 1) // max(1, int(os.getenv('WEB_CONCURRENCY', '1'))))
+        self.workers = max(0, int(workers))
+        self.queue_limit = max(1, int(queue_limit))
+        self.timeout = float(timeout)
+        self.method = canonical_method(method)
+        self.salt_length = int(salt_length)
+        self._slots = threading.BoundedSemaphore(self.queue_limit)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @classmethod
+    def from_env(cls):
+        workers = os.getenv('PASSWORD_HASH_WORKERS')
+        return cls(
+            workers=int(workers) if workers else None,
+            queue_limit=int(os.getenv('PASSWORD_HASH_QUEUE', '64')),
+            timeout=float(os.getenv('PASSWORD_HASH_TIMEOUT', '10')),
+            method=os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2'),
+            salt_length=int(os.getenv('PASSWORD_HASH_SALT_LENGTH', '16'))
+        )
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # Spawned, not forked: forking a process that already runs request and
+                # write-behind threads can copy a held lock into the child
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._pool
+
+    def _run(self, fn, *args):
+        """Run fn(*args) on the pool once a queue slot is free.
+
+        The slot is held until the job is done in the pool, not just until this caller
+        stops waiting, so queue_limit bounds the work queued there. Waiting longer than
+        the timeout for a slot or for the result raises HashingBusy.
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._stats_lock:
+                self.rejected += 1
+            raise HashingBusy('Password hashing queue is full')
+        with self._stats_lock:
+            self.in_flight += 1
+        if self.workers == 0:
+            try:
+                result = fn(*args)
+            finally:
+                self._release()
+            self._count('completed')
+            return result
+        try:
+            future = self._get_pool().submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        try:
+            result = future.result(timeout=self.timeout)
+        except FuturesTimeoutError:
+            # Dropped if it has not started yet; a running job keeps its slot until it ends
+            future.cancel()
+            self._count('timed_out')
+            raise HashingBusy('Password hashing timed out')
+        self._count('completed')
+        return result
+    
+    def _release(self, future=None):
+        self._slots.release()
+        with self._stats_lock:
+            self.in_flight -= 1
+    
+    def _count(self, stat):
+        with self._stats_lock:
+            setattr(self, stat, getattr(self, stat) + 1)
+
+    def hash(self, password):
+        """New hash of a password with the configured method"""
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, pwhash, password):
+        """True if the password matches the stored hash"""
+        if not pwhash:
+            return False
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """True if a stored hash was made with other parameters than the configured ones"""
+        return str(pwhash or '').split('$', 1)[0] != self.method
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'method': self.method,
+                'workers': self.workers,
+                'queue_limit': self.queue_limit,
+                'in_flight': self.in_flight,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out
+            }
+
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+_hasher = {'instance': None, 'pid': None}
+_hasher_lock = threading.Lock()
+
+
+def get_hasher():
+    """The hasher for this process (gunicorn forks workers after import, so pools are per pid)"""
+    with _hasher_lock:
+        if _hasher['instance'] is None or _hasher['pid'] != os.getpid():
+            _hasher['instance'] = PasswordHasher.from_env()
+            _hasher['pid'] = os.getpid()
+        return _hasher['instance']
+
+
+def reset_hasher():
+    """Drop this process's hasher so the next get_hasher() re-reads the environment"""
+    with _hasher_lock:
+        hasher = _hasher['instance'] if _hasher['pid'] == os.getpid() else None
+        _hasher['instance'] = None
+        _hasher['pid'] = None
+    if hasher is not None:
+        hasher.close()
@@ -0,0 +1,204 @@
+"""
+Quota-aware scheduler for Google Sheets API calls
+Every Sheets request in the process takes a token from a per-minute budget
+(reads and writes are metered separately, like the Sheets quota), waiting in
+priority order when the budget is spent. 429 and 5xx responses are retried
+with jittered exponential backoff instead of surfacing as 500s.
+"""
+import contextlib
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+
+import gspread
+
+# Priorities, lower runs first
+INTERACTIVE = 0
+BULK = 10
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _status_code(error):
+    """HTTP status of a gspread APIError or googleapiclient HttpError (None if unknown)"""
+    response = getattr(error, 'response', None)
+    if response is not None and hasattr(response, 'status_code'):
+        return response.status_code
+    resp = getattr(error, 'resp', None)
+    if resp is not None and hasattr(resp, 'status'):
+        return int(resp.status)
+    return None
+
+
+class TokenBucket:
+    """Refills `per_minute` tokens a minute up to `burst`; callers wait by priority"""
+
+    def __init__(self, per_minute, burst=None):
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst or per_minute)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+        self._waiters = []      # heap of (priority, sequence)
+        self._sequence = itertools.count()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, priority=INTERACTIVE):
+        """Block until a token is available and every higher-priority waiter is served"""
+        with self._cond:
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    self._refill()
+                    if self._waiters[0] == ticket and self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    delay = (1 - self.tokens) / self.rate if self.tokens < 1 else None
+                    self._cond.wait(delay)
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def drain(self):
+        """Spend the whole budget, e.g. after the API reported the quota as exhausted"""
+        with self._cond:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0)
+
+    @property
+    def waiting(self):
+        return len(self._waiters)
+
+    def stats(self):
+        with self._cond:
+            self._refill()
+            return {
+                'tokens': round(self.tokens, 2),
+                'per_minute': round(self.rate * 60, 2),
+                'waiting': len(self._waiters)
+            }
+
+
+class QuotaScheduler:
+    """Runs API calls under the read/write budgets with retry on 429/5xx"""
+
+    def __init__(self, reads_per_minute=60, writes_per_minute=60, max_retries=5,
+                 backoff_base=1.0, backoff_max=64.0):
+        self.buckets = {
+            'read': TokenBucket(reads_per_minute),
+            'write': TokenBucket(writes_per_minute)
+        }
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+        self.failures = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            reads_per_minute=float(os.getenv('SHEETS_READS_PER_MINUTE', '60')),
+            writes_per_minute=float(os.getenv('SHEETS_WRITES_PER_MINUTE', '60')),
+            max_retries=int(os.getenv('SHEETS_MAX_RETRIES', '5')),
+            backoff_base=float(os.getenv('SHEETS_BACKOFF_BASE', '1.0'))
+        )
+
+    @contextlib.contextmanager
+    def bulk(self):
+        """Run the calls made by this thread behind interactive traffic (imports, seeding scripts)"""
+        previous = getattr(self._local, 'priority', INTERACTIVE)
+        self._local.priority = BULK
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    def _backoff(self, attempt):
+        # "Full jitter": spreads retries from many workers across the whole window
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def call(self, fn, *args, kind='read', **kwargs):
+        """Run fn(*args, **kwargs) once a token is available, retrying throttled/5xx failures"""
+        bucket = self.buckets[kind]
+        priority = getattr(self._local, 'priority', INTERACTIVE)
+        attempt = 0
+        while True:
+            bucket.acquire(priority)
+            with self._lock:
+                self.in_flight += 1
+                self.calls += 1
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                status = _status_code(e)
+                if status not in RETRY_STATUSES or attempt >= self.max_retries:
+                    if status in RETRY_STATUSES:
+                        with self._lock:
+                            self.failures += 1
+                    raise
+                with self._lock:
+                    self.retries += 1
+                    if status == 429:
+                        self.throttled += 1
+                if status == 429:
+                    # Everyone else in this process is about to hit the same limit
+                    bucket.drain()
+                delay = self._backoff(attempt)
+                print(f"[DEBUG] Sheets API returned {status}, retrying in {delay:.1f}s")
+                attempt += 1
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+            time.sleep(delay)
+
+    def queue_depth(self):
+        """Number of calls waiting for quota"""
+        return sum(bucket.waiting for bucket in self.buckets.values())
+
+    def stats(self):
+        with self._lock:
+            counters = {
+                'in_flight': self.in_flight,
+                'calls': self.calls,
+                'retries': self.retries,
+                'throttled': self.throttled,
+                'failures': self.failures
+            }
+        counters['queue_depth'] = self.queue_depth()
+        counters['buckets'] = {kind: bucket.stats() for kind, bucket in self.buckets.items()}
+        return counters
+
+
+_scheduler = {'instance': None, 'pid': None}
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """The process-wide scheduler shared by every Sheets client (one per forked worker)"""
+    with _scheduler_lock:
+        if _scheduler['instance'] is None or _scheduler['pid'] != os.getpid():
+            _scheduler['instance'] = QuotaScheduler.from_env()
+            _scheduler['pid'] = os.getpid()
+        return _scheduler['instance']
+
+
+class ScheduledClient(gspread.Client):
+    """gspread client whose HTTP requests all go through the quota scheduler"""
+
+    def request(self, method, endpoint, *args, **kwargs):
+        kind = 'read' if method.lower() == 'get' else 'write'
+        return get_scheduler().call(super().request, method, endpoint, *args, kind=kind, **kwargs)
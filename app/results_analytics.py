@@ -0,0 +1,134 @@
+"""
+Results analytics
+Per-student GPA and average marks, per-subject rank and percentile, and
+leaderboards, computed in one pass over the Results rows. Backends keep one
+instance per version of the Results sheet so dashboards don't pull raw rows.
+"""
+
+# Letter grade -> grade point (4.0 scale); unknown grades are left out of the GPA
+GRADE_POINTS = {
+    'A+': 4.0, 'A': 3.75, 'A-': 3.5, 'B+': 3.25, 'B': 3.0, 'B-': 2.75,
+    'C+': 2.5, 'C': 2.25, 'D': 2.0, 'F': 0.0
+}
+
+
+def _marks(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _mean(values):
+    return round(sum(values) / len(values), 2) if values else None
+
+
+class ResultsAnalytics:
+    """Aggregates over Results rows (ID, User ID, Subject, Marks, Grade, ...)"""
+
+    def __init__(self, records, version=None):
+        self.version = version
+        marks = {}      # (user_id, subject) -> [marks]
+        points = {}     # user_id -> [grade points]
+        for record in records:
+            user_id = str(record.get('User ID', '')).strip()
+            subject = str(record.get('Subject', '')).strip()
+            if not user_id or not subject:
+                continue
+            value = _marks(record.get('Marks'))
+            if value is not None:
+                marks.setdefault((user_id, subject), []).append(value)
+            point = GRADE_POINTS.get(str(record.get('Grade', '')).strip().upper())
+            if point is not None:
+                points.setdefault(user_id, []).append(point)
+
+        self.students = {}  # user_id -> {'user_id', 'gpa', 'average', 'results', 'subjects'}
+        totals = {}         # user_id -> [sum of marks, count]
+        by_subject = {}     # subject -> {user_id: average marks}
+        for (user_id, subject), values in marks.items():
+            average = _mean(values)
+            by_subject.setdefault(subject, {})[user_id] = average
+            student = self._student(user_id)
+            student['results'] += len(values)
+            student['subjects'][subject] = {'average': average}
+            total = totals.setdefault(user_id, [0.0, 0])
+            total[0] += sum(values)
+            total[1] += len(values)
+        for user_id, (total, count) in totals.items():
+            self.students[user_id]['average'] = round(total / count, 2)
+        for user_id, values in points.items():
+            self._student(user_id)['gpa'] = _mean(values)
+
+        # Rank each subject once (competition ranking: 1, 2, 2, 4); the percentile
+        # counts students below plus half of those tied
+        self.subjects = {}
+        for subject, averages in by_subject.items():
+            ordered = sorted(averages.items(), key=lambda item: (-item[1], item[0]))
+            values = [average for _, average in ordered]
+            count = len(ordered)
+            start = 0
+            while start < count:
+                end = start
+                while end < count and values[end] == values[start]:
+                    end += 1
+                percentile = round(100 * ((count - end) + 0.5 * (end - start)) / count, 1)
+                for user_id, _ in ordered[start:end]:
+                    entry = self.students[user_id]['subjects'][subject]
+                    entry.update(rank=start + 1, of=count, percentile=percentile)
+                start = end
+            middle = count // 2
+            self.subjects[subject] = {
+                'subject': subject,
+                'students': count,
+                'average': _mean(values),
+                'highest': values[0],
+                'lowest': values[-1],
+                'median': values[middle] if count % 2 else round((values[middle - 1] + values[middle]) / 2, 2),
+                'ranking': ordered
+            }
+
+    def _student(self, user_id):
+        student = self.students.get(user_id)
+        if student is None:
+            student = self.students[user_id] = {
+                'user_id': user_id, 'gpa': None, 'average': None, 'results': 0, 'subjects': {}
+            }
+        return student
+
+    def student(self, user_id):
+        """One student's GPA, average and per-subject rank/percentile, or None"""
+        student = self.students.get(str(user_id).strip())
+        if student is None:
+            return None
+        return dict(student, subjects={s: dict(v) for s, v in student['subjects'].items()})
+
+    def subject_stats(self, subject=None):
+        """Count/average/median/highest/lowest per subject (case-insensitive filter)"""
+        return [
+            {k: v for k, v in stats.items() if k != 'ranking'}
+            for name, stats in sorted(self.subjects.items())
+            if subject is None or name.lower() == subject.lower()
+        ]
+
+    def leaderboard(self, subject=None, limit=10):
+        """Top students overall (by GPA, then average) or in one subject (by average marks)"""
+        if subject is None:
+            ordered = sorted(
+                self.students.values(),
+                key=lambda s: (-(s['gpa'] or 0), -(s['average'] or 0), s['user_id'])
+            )
+            return [
+                {'rank': position + 1, 'user_id': s['user_id'], 'gpa': s['gpa'], 'average': s['average']}
+                for position, s in enumerate(ordered[:limit])
+            ]
+        stats = next((v for k, v in self.subjects.items() if k.lower() == subject.lower()), None)
+        if stats is None:
+            return []
+        board = []
+        for user_id, average in stats['ranking'][:limit]:
+            entry = self.students[user_id]['subjects'][stats['subject']]
+            board.append({
+                'rank': entry['rank'], 'user_id': user_id, 'average': average,
+                'percentile': entry['percentile']
+            })
+        return board
@@ -4,44 +4,187 @@ Attendance routes - Using Google Sheets
 
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.google_sheets_db import GoogleSheetsDB
+from app.database import get_db
+from app.identity import current_identity
+from app.pagination import page_params, page_response
+from app.attendance_index import date_key
+from app.export import FORMATS, export_response
 from datetime import datetime
 
 attendance_bp = Blueprint('attendance', __name__)
 
+# Largest class session accepted by POST /bulk
+BULK_MAX_RECORDS = 500
+
+def _attendance_filters():
+    """from/to/status/student_id query parameters as query_attendance() keyword arguments"""
+    filters = {}
+    for param, key in (('from', 'date_from'), ('to', 'date_to')):
+        value = request.args.get(param)
+        if value:
+            try:
+                filters[key] = datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d')
+            except ValueError:
+                raise ValueError(f"'{param}' must be a date in YYYY-MM-DD format")
+    if request.args.get('status'):
+        filters['status'] = request.args['status']
+    if request.args.get('student_id'):
+        filters['student_id'] = request.args['student_id']
+    return filters
+
 @attendance_bp.route('', methods=['GET'])
 @jwt_required()
 def get_attendance():
     """Get attendance records"""
     try:
-        db = GoogleSheetsDB()
-        identity = get_jwt_identity()
-        user_id = int(str(identity).strip()) if identity else None
+        db = get_db()
+        identity = current_identity()
         
-        if not user_id:
+        if identity is None:
             return jsonify({'message': 'Invalid token'}), 401
         
-        user = db.find_user_by_id(user_id)
+        subject = request.args.get('subject')
+        
+        try:
+            filters = _attendance_filters()
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        
+        if not identity.is_admin:
+            # Students can only see their own
+            student_id = identity.student_id
+            if not student_id:
+                return jsonify([]), 200
+            filters['student_id'] = student_id
         
-        if not user:
-            return jsonify({'message': 'User not found'}), 404
+        # Read from the subject sheets like /summary and /export, filtered or not
+        try:
+            page = page_params(cursor_type=list)
+            if page is not None:
+                items, next_cursor = db.query_attendance_page(*page, subject=subject, **filters)
+                return page_response(items, next_cursor), 200
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        records = db.query_attendance(subject=subject, **filters)
+        
+        return jsonify(records), 200
+    except Exception as e:
+        print(f'[ERROR] get_attendance: {e}')
+        return jsonify({'message': f'Error: {str(e)}'}), 500
+
+@attendance_bp.route('/summary', methods=['GET'])
+@jwt_required()
+def get_attendance_summary():
+    """Attendance counts and percentage per student and subject"""
+    try:
+        db = get_db()
+        identity = current_identity()
+        
+        if identity is None:
+            return jsonify({'message': 'Invalid token'}), 401
         
         subject = request.args.get('subject')
         
-        if user.get('Role', 'student') == 'admin':
-            # Admin can see all attendance
-            records = db.get_all_attendance()
-            if subject:
-                records = [r for r in records if r.get('Subject', '').lower() == subject.lower()]
+        if identity.is_admin:
+            # Admin can see every student, or one with ?student_id=
+            student_id = request.args.get('student_id')
         else:
             # Students can only see their own
-            records = db.get_user_attendance(user_id)
-            if subject:
-                records = [r for r in records if r.get('Subject', '').lower() == subject.lower()]
+            student_id = identity.student_id
+            if not student_id:
+                return jsonify([]), 200
         
-        return jsonify(records), 200
+        return jsonify(db.get_attendance_summary(student_id=student_id, subject=subject)), 200
     except Exception as e:
-        print(f'[ERROR] get_attendance: {e}')
+        print(f'[ERROR] get_attendance_summary: {e}')
+        return jsonify({'message': f'Error: {str(e)}'}), 500
+
+@attendance_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_attendance():
+    """Stream subject attendance as CSV or NDJSON (admin only)"""
+    try:
+        db = get_db()
+        identity = current_identity()
+
+        if identity is None:
+            return jsonify({'message': 'Invalid token'}), 401
+
+        if not identity.is_admin:
+            return jsonify({'message': 'Unauthorized'}), 403
+
+        fmt = request.args.get('format', 'csv').lower()
+        if fmt not in FORMATS:
+            return jsonify({'message': f"format must be one of {', '.join(FORMATS)}"}), 400
+        try:
+            filters = _attendance_filters()
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        print(f'[ERROR] export_attendance: {e}')
+        return jsonify({'message': f'Error: {str(e)}'}), 500
+
+    def rows():
+        student_id = filters.get('student_id')
+        status = filters.get('status', '').lower()
+        date_from, date_to = filters.get('date_from'), filters.get('date_to')
+        for record in db.iter_attendance(request.args.get('subject')):
+            if student_id and str(record.get('Student ID', '')).strip() != student_id.strip():
+                continue
+            if status and str(record.get('Status', '')).strip().lower() != status:
+                continue
+            if date_from or date_to:
+                key = date_key(record.get('Date'))
+                if not key or (date_from and key < date_from) or (date_to and key > date_to):
+                    continue
+            yield record
+
+    return export_response(rows(), ['Subject', 'Student ID', 'Date', 'Status'], fmt, 'attendance')
+
+@attendance_bp.route('/bulk', methods=['POST'])
+@jwt_required()
+def create_attendance_bulk():
+    """Mark attendance for a whole class session in one write (admin only)"""
+    try:
+        db = get_db()
+        identity = current_identity()
+
+        if identity is None:
+            return jsonify({'message': 'Invalid token'}), 401
+
+        if not identity.is_admin:
+            return jsonify({'message': 'Unauthorized'}), 403
+
+        data = request.get_json() or {}
+        entries = data.get('records')
+        if not data.get('subject') or not isinstance(entries, list) or not entries:
+            return jsonify({'message': 'subject and a non-empty records list are required'}), 400
+        if len(entries) > BULK_MAX_RECORDS:
+            return jsonify({'message': f'At most {BULK_MAX_RECORDS} records per request'}), 400
+
+        subject = next((s for s in db.get_all_attendance_subjects()
+                        if s.lower() == str(data['subject']).lower()), None)
+        if subject is None:
+            return jsonify({'message': 'Subject not found'}), 404
+
+        try:
+            date = datetime.strptime(data.get('date') or datetime.now().strftime('%Y-%m-%d'), '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'message': "'date' must be in YYYY-MM-DD format"}), 400
+        date = date.strftime('%Y-%m-%d')
+
+        outcomes = db.add_attendance_bulk(subject, date, entries)
+        written = sum(1 for outcome in outcomes if outcome['ok'])
+        body = {
+            'subject': subject,
+            'date': date,
+            'written': written,
+            'failed': len(outcomes) - written,
+            'results': outcomes
+        }
+        return jsonify(body), 201 if written else 400
+    except Exception as e:
+        print(f'[ERROR] create_attendance_bulk: {e}')
         return jsonify({'message': f'Error: {str(e)}'}), 500
 
 @attendance_bp.route('', methods=['POST'])
@@ -49,17 +192,14 @@ def get_attendance():
 def create_attendance():
     """Create attendance record (admin only)"""
     try:
-        db = GoogleSheetsDB()
-        identity = get_jwt_identity()
-        user_id = int(str(identity).strip()) if identity else None
+        db = get_db()
+        identity = current_identity()
 
-        if not user_id:
+        if identity is None:
             return jsonify({'message': 'Invalid token'}), 401
 
-        user = db.find_user_by_id(user_id)
-
         # Only admin can manually create records
-        if not user or user.get('Role', 'student') != 'admin':
+        if not identity.is_admin:
             return jsonify({'message': 'Unauthorized'}), 403
 
         data = request.get_json()
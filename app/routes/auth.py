@@ -3,9 +3,11 @@ Authentication routes - Using Google Sheets
 """
 
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from app.google_sheets_db import GoogleSheetsDB
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask_jwt_extended import create_access_token, create_refresh_token, decode_token, jwt_required, get_jwt
+from app.database import get_db
+from app.identity import current_identity, token_claims, user_version
+from app.password_hashing import HashingBusy, get_hasher
+from app.token_revocation import get_revocation_store, revoke_user_tokens
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -13,7 +15,7 @@ auth_bp = Blueprint('auth', __name__)
 def register():
     """Register a new student"""
     try:
-        db = GoogleSheetsDB()
+        db = get_db()
         data = request.get_json()
         
         # Validate required fields
@@ -27,8 +29,7 @@ def register():
             return jsonify({'message': 'Email already registered'}), 400
         
         # Check if student ID already exists
-        users = db.get_all_users()
-        if any(str(u.get('Student ID', '')) == str(data['student_id']) for u in users):
+        if db.find_user_by_student_id(data['student_id']):
             return jsonify({'message': 'Student ID already exists'}), 400
         
         # Create new user
@@ -36,7 +37,7 @@ def register():
             'name': data['full_name'],
             'student_id': data['student_id'],
             'email': data['email'],
-            'password': generate_password_hash(data['password']),
+            'password': get_hasher().hash(data['password']),
             'phone': data.get('contact_number', ''),
             'role': 'student',
             'section': data.get('section', '')
@@ -52,6 +53,9 @@ def register():
         else:
             return jsonify({'message': 'Failed to create user'}), 500
             
+    except HashingBusy:
+        print('[REGISTER ERROR] Password hashing queue is full')
+        return jsonify({'message': 'Server busy, please try again'}), 503, {'Retry-After': '2'}
     except Exception as e:
         print(f'[REGISTER ERROR] {e}')
         return jsonify({'message': f'Registration failed: {str(e)}'}), 500
@@ -60,7 +64,7 @@ def register():
 def login():
     """Login user"""
     try:
-        db = GoogleSheetsDB()
+        db = get_db()
         data = request.get_json()
         print(f'[LOGIN] Login attempt with email: {data.get("email")}, role: {data.get("role")}')
         
@@ -77,8 +81,9 @@ def login():
             print('[LOGIN ERROR] User not found')
             return jsonify({'message': 'Invalid email or password'}), 401
         
-        # Check password
-        if not check_password_hash(user.get('Password', ''), data['password']):
+        # Check password (on the hashing pool, off this thread)
+        hasher = get_hasher()
+        if not hasher.verify(user.get('Password', ''), data['password']):
             print('[LOGIN ERROR] Invalid password')
             return jsonify({'message': 'Invalid email or password'}), 401
         
@@ -91,15 +96,27 @@ def login():
             print(f'[LOGIN ERROR] Role mismatch. User role: {user.get("Role")}, requested: {data["role"]}')
             return jsonify({'message': 'Invalid role'}), 401
         
+        # Upgrade hashes made with older parameters while we have the plaintext
+        if hasher.needs_rehash(user.get('Password', '')):
+            updated = db.update_user(user.get('ID'), {'Password': hasher.hash(data['password'])})
+            if updated and str(updated.get('ID')) == str(user.get('ID')):
+                print(f'[LOGIN] Rehashed password for user {user.get("ID")} with {hasher.method}')
+                user = updated
+        
         # Create JWT token
         user_id = user.get('ID', '')
         print(f'[LOGIN] Creating token for user ID: {user_id}')
-        access_token = create_access_token(identity=str(user_id))
+        # Role and Student ID travel in the token so requests don't look the user up;
+        # the access token is short-lived and renewed with the refresh token
+        claims = token_claims(user)
+        access_token = create_access_token(identity=str(user_id), additional_claims=claims)
+        refresh_token = create_refresh_token(identity=str(user_id), additional_claims={'uv': claims['uv']})
         
         print(f'[LOGIN] Login successful for user {user_id}')
         return jsonify({
             'message': 'Login successful',
             'token': access_token,
+            'refresh_token': refresh_token,
             'user': {
                 'id': user.get('ID'),
                 'full_name': user.get('Full Name'),
@@ -109,27 +126,93 @@ def login():
             }
         }), 200
         
+    except HashingBusy:
+        print('[LOGIN ERROR] Password hashing queue is full')
+        return jsonify({'message': 'Server busy, please try again'}), 503, {'Retry-After': '2'}
     except Exception as e:
         print(f'[LOGIN ERROR] {e}')
         return jsonify({'message': f'Login failed: {str(e)}'}), 500
 
+@auth_bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    """Issue a new access token carrying the user's current role"""
+    try:
+        identity = current_identity()
+        if identity is None:
+            return jsonify({'message': 'Invalid token'}), 401
+        
+        user = identity.user
+        if not user:
+            return jsonify({'message': 'User not found'}), 401
+        if str(user.get('is_active', 'true')).lower() == 'false':
+            return jsonify({'message': 'User account is disabled'}), 403
+        # Disabling the account invalidates earlier refresh tokens
+        if get_jwt().get('uv') != user_version(user):
+            return jsonify({'message': 'Session expired, please log in again'}), 401
+        
+        access_token = create_access_token(identity=str(identity.user_id), additional_claims=token_claims(user))
+        return jsonify({'token': access_token}), 200
+    except Exception as e:
+        print(f'[REFRESH ERROR] {e}')
+        return jsonify({'message': f'Refresh failed: {str(e)}'}), 500
+
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required(verify_type=False)
+def logout():
+    """Revoke the presented token, and the session's refresh token if sent as {"refresh_token": ...}"""
+    try:
+        claims = get_jwt()
+        store = get_revocation_store()
+        store.revoke(claims['jti'], claims.get('exp'))
+        
+        refresh_token = (request.get_json(silent=True) or {}).get('refresh_token')
+        if refresh_token:
+            try:
+                refresh_claims = decode_token(refresh_token)
+            except Exception:
+                refresh_claims = None   # Already expired, revoked or not a token
+            # Only the caller's own tokens can be revoked this way
+            if refresh_claims and refresh_claims.get('sub') == claims.get('sub'):
+                store.revoke(refresh_claims['jti'], refresh_claims.get('exp'))
+        
+        return jsonify({'message': 'Logged out'}), 200
+    except Exception as e:
+        print(f'[LOGOUT ERROR] {e}')
+        return jsonify({'message': f'Logout failed: {str(e)}'}), 500
+
+@auth_bp.route('/logout-all', methods=['POST'])
+@jwt_required(verify_type=False)
+def logout_all():
+    """Sign out of every session: revokes all tokens issued to the caller so far"""
+    try:
+        identity = current_identity()
+        if identity is None:
+            return jsonify({'message': 'Invalid token'}), 401
+        
+        revoke_user_tokens(identity.user_id)
+        return jsonify({'message': 'Logged out of all sessions'}), 200
+    except Exception as e:
+        print(f'[LOGOUT ERROR] {e}')
+        return jsonify({'message': f'Logout failed: {str(e)}'}), 500
+
 @auth_bp.route('/verify-token', methods=['GET'])
 @jwt_required()
 def verify_token():
-    """Verify if token is valid"""
-    db = GoogleSheetsDB()
-    user_id = int(get_jwt_identity())
-    user = db.find_user_by_id(user_id)
+    """Verify if token is valid (answered from the token's claims; ?profile=1 adds name and email)"""
+    identity = current_identity()
+    if identity is None:
+        return jsonify({'message': 'Invalid token'}), 401
     
-    if not user:
-        return jsonify({'message': 'User not found'}), 404
+    user = {
+        'id': identity.user_id,
+        'role': identity.role or 'student',
+        'student_id': identity.student_id
+    }
+    if request.args.get('profile', '').lower() in ('1', 'true', 'yes'):
+        profile = identity.user
+        if not profile:
+            return jsonify({'message': 'User not found'}), 404
+        user.update(name=profile.get('Full Name'), email=profile.get('Email'))
     
-    return jsonify({
-        'valid': True,
-        'user': {
-            'id': user.get('ID'),
-            'name': user.get('Full Name'),
-            'email': user.get('Email'),
-            'role': user.get('Role', 'student')
-        }
-    }), 200
+    return jsonify({'valid': True, 'user': user}), 200
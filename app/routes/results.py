@@ -3,8 +3,11 @@ Results routes - Using Google Sheets
 """
 
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.google_sheets_db import GoogleSheetsDB
+from flask_jwt_extended import jwt_required
+from app.database import get_db
+from app.identity import current_identity
+from app.pagination import page_params, page_response
+from app.export import FORMATS, export_response
 from datetime import datetime
 
 results_bp = Blueprint('results', __name__)
@@ -13,11 +16,24 @@ results_bp = Blueprint('results', __name__)
 @jwt_required()
 def get_results():
     """Get results"""
-    db = GoogleSheetsDB()
-    user_id = int(get_jwt_identity())
-    user = db.find_user_by_id(user_id)
+    db = get_db()
+    identity = current_identity()
     
-    if user.get('Role', 'student') == 'admin':
+    if identity is None:
+        return jsonify({'message': 'Invalid token'}), 401
+    user_id = identity.user_id
+    
+    try:
+        page = page_params()
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    if page is not None:
+        # Students only page through their own results
+        owner = None if identity.is_admin else user_id
+        items, next_cursor = db.get_results_page(*page, user_id=owner)
+        return page_response(items, next_cursor), 200
+    
+    if identity.is_admin:
         # Admin can see all results
         results = db.get_all_results()
     else:
@@ -26,15 +42,90 @@ def get_results():
     
     return jsonify(results), 200
 
+@results_bp.route('/stats', methods=['GET'])
+@jwt_required()
+def get_results_stats():
+    """Per-subject statistics, plus GPA and per-subject rank for one student"""
+    try:
+        db = get_db()
+        identity = current_identity()
+        
+        if identity is None:
+            return jsonify({'message': 'Invalid token'}), 401
+        
+        analytics = db.results_analytics()
+        subject = request.args.get('subject')
+        stats = {
+            'students': len(analytics.students),
+            'subjects': analytics.subject_stats(subject)
+        }
+        
+        if identity.is_admin:
+            # Admin can look at any student with ?user_id=
+            if request.args.get('user_id'):
+                stats['student'] = analytics.student(request.args['user_id'])
+        else:
+            # Students only see their own standing
+            stats['student'] = analytics.student(identity.user_id)
+        
+        return jsonify(stats), 200
+    except Exception as e:
+        print(f'[ERROR] get_results_stats: {e}')
+        return jsonify({'message': f'Error: {str(e)}'}), 500
+
+@results_bp.route('/leaderboard', methods=['GET'])
+@jwt_required()
+def get_leaderboard():
+    """Top students overall by GPA, or in one subject with ?subject= (admin only)"""
+    try:
+        db = get_db()
+        identity = current_identity()
+        
+        if identity is None or not identity.is_admin:
+            return jsonify({'message': 'Unauthorized'}), 403
+        
+        try:
+            limit = max(1, min(int(request.args.get('limit', 10)), 100))
+        except ValueError:
+            return jsonify({'message': 'limit must be an integer'}), 400
+        
+        board = db.results_analytics().leaderboard(request.args.get('subject'), limit)
+        # Only the top entries need a name, so look them up one by one
+        for entry in board:
+            student = db.find_user_by_id(entry['user_id'])
+            entry['name'] = student.get('Full Name', '') if student else ''
+            entry['student_id'] = student.get('Student ID', '') if student else ''
+        
+        return jsonify(board), 200
+    except Exception as e:
+        print(f'[ERROR] get_leaderboard: {e}')
+        return jsonify({'message': f'Error: {str(e)}'}), 500
+
+@results_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_results():
+    """Stream results as CSV or NDJSON (admin only; ?user_id= for one student)"""
+    db = get_db()
+    identity = current_identity()
+    
+    if identity is None or not identity.is_admin:
+        return jsonify({'message': 'Unauthorized'}), 403
+    
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in FORMATS:
+        return jsonify({'message': f"format must be one of {', '.join(FORMATS)}"}), 400
+    
+    rows = db.iter_results(request.args.get('user_id'))
+    return export_response(rows, ['ID', 'User ID', 'Subject', 'Marks', 'Grade', 'Date'], fmt, 'results')
+
 @results_bp.route('/student/<int:student_id>', methods=['GET'])
 @jwt_required()
 def get_student_results(student_id):
     """Get results for specific student (admin only)"""
-    db = GoogleSheetsDB()
-    user_id = int(get_jwt_identity())
-    user = db.find_user_by_id(user_id)
+    db = get_db()
+    identity = current_identity()
     
-    if not user or user.get('Role', 'student') != 'admin':
+    if identity is None or not identity.is_admin:
         return jsonify({'message': 'Unauthorized'}), 403
     
     results = db.get_user_results(student_id)
@@ -45,11 +136,10 @@ def get_student_results(student_id):
 @jwt_required()
 def create_result():
     """Create result (admin only)"""
-    db = GoogleSheetsDB()
-    user_id = int(get_jwt_identity())
-    user = db.find_user_by_id(user_id)
+    db = get_db()
+    identity = current_identity()
     
-    if not user or user.get('Role', 'student') != 'admin':
+    if identity is None or not identity.is_admin:
         return jsonify({'message': 'Unauthorized'}), 403
     
     data = request.get_json()
@@ -3,8 +3,12 @@ Routine management routes - Using Google Sheets
 """
 
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.google_sheets_db import GoogleSheetsDB
+from flask_jwt_extended import jwt_required
+from app.database import get_db
+from app.identity import current_identity
+from app.pagination import page_params, page_response
+from app.timetable import day_name, parse_time
+from datetime import datetime
 
 routines_bp = Blueprint('routines', __name__)
 
@@ -13,18 +17,22 @@ routines_bp = Blueprint('routines', __name__)
 def get_routines():
     """Get all routines or filter by day"""
     try:
-        db = GoogleSheetsDB()
+        db = get_db()
         day = request.args.get('day')
         
-        all_routines = db.get_all_routines()
-        print(f'[DEBUG] get_routines: Retrieved {len(all_routines)} routines')
-        if all_routines:
-            print(f'[DEBUG] First routine: {all_routines[0]}')
+        try:
+            page = page_params()
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        if page is not None:
+            items, next_cursor = db.get_routines_page(*page, day=day)
+            return page_response(items, next_cursor), 200
         
         if day:
-            routines = [r for r in all_routines if r.get('day', '').lower() == day.lower()]
+            # Served from the timetable's per-day index
+            routines = db.timetable().day(day)
         else:
-            routines = all_routines
+            routines = db.get_all_routines()
         
         print(f'[DEBUG] Returning {len(routines)} routines')
         return jsonify(routines), 200
@@ -32,16 +40,58 @@ def get_routines():
         print(f'[ERROR] get_routines: {e}')
         return jsonify({'message': f'Error: {str(e)}'}), 500
 
+def _day_and_minute():
+    """Weekday and minutes after midnight from ?day=&time=, defaulting to now (server time)"""
+    now = datetime.now()
+    day = day_name(request.args.get('day') or now.strftime('%A'))
+    if day is None:
+        raise ValueError("'day' must be a weekday name")
+    time = request.args.get('time')
+    minute = parse_time(time) if time else now.hour * 60 + now.minute
+    if minute is None:
+        raise ValueError("'time' must be in HH:MM format")
+    return day, minute
+
+@routines_bp.route('/now', methods=['GET'])
+@jwt_required()
+def get_current_routines():
+    """Classes in progress now (or at ?day=&time=)"""
+    try:
+        day, minute = _day_and_minute()
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    try:
+        db = get_db()
+        return jsonify({'day': day, 'routines': db.timetable().current(day, minute)}), 200
+    except Exception as e:
+        print(f'[ERROR] get_current_routines: {e}')
+        return jsonify({'message': f'Error: {str(e)}'}), 500
+
+@routines_bp.route('/next', methods=['GET'])
+@jwt_required()
+def get_next_routines():
+    """Next classes to start after now (or after ?day=&time=), looking ahead through the week"""
+    try:
+        day, minute = _day_and_minute()
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    try:
+        db = get_db()
+        next_day, routines = db.timetable().upcoming(day, minute)
+        return jsonify({'day': next_day, 'routines': routines}), 200
+    except Exception as e:
+        print(f'[ERROR] get_next_routines: {e}')
+        return jsonify({'message': f'Error: {str(e)}'}), 500
+
 @routines_bp.route('/<int:routine_id>', methods=['GET'])
 @jwt_required()
 def get_routine(routine_id):
     """Get specific routine"""
-    db = GoogleSheetsDB()
-    all_routines = db.get_all_routines()
+    db = get_db()
+    routine = db.timetable().find(routine_id)
     
-    for routine in all_routines:
-        if str(routine.get('ID', '')) == str(routine_id):
-            return jsonify(routine), 200
+    if routine:
+        return jsonify(routine), 200
     
     return jsonify({'message': 'Routine not found'}), 404
 
@@ -50,27 +100,20 @@ def get_routine(routine_id):
 def create_routine():
     """Create new routine (admin only)"""
     try:
-        db = GoogleSheetsDB()
+        db = get_db()
         print('[DEBUG] Creating routine endpoint called')
         
-        identity = get_jwt_identity()
-        user_id = int(str(identity).strip()) if identity else None
-        print(f'[DEBUG] User ID from JWT: {user_id}')
+        identity = current_identity()
         
-        if not user_id:
+        if identity is None:
             print('[ERROR] Invalid token - no user ID')
             return jsonify({'message': 'Invalid token'}), 401
-        
-        user = db.find_user_by_id(user_id)
-        print(f'[DEBUG] User found: {user is not None}')
-        
-        if not user:
-            print('[ERROR] User not found in database')
-            return jsonify({'message': 'User not found'}), 404
+        user_id = identity.user_id
+        print(f'[DEBUG] User ID from JWT: {user_id}')
             
-        if user.get('Role', 'student') != 'admin':
-            print(f'[ERROR] User role is {user.get("Role")}, not admin')
-            return jsonify({'message': f'Unauthorized. Your role is {user.get("Role")}, only admins can create routines'}), 403
+        if not identity.is_admin:
+            print(f'[ERROR] User role is {identity.role}, not admin')
+            return jsonify({'message': f'Unauthorized. Your role is {identity.role}, only admins can create routines'}), 403
         
         data = request.get_json()
         print(f'[DEBUG] Request data: {data}')
@@ -82,6 +125,16 @@ def create_routine():
             print(f'[ERROR] Missing fields: {missing}')
             return jsonify({'message': f'Missing required fields: {", ".join(missing)}'}), 400
         
+        # Reject a slot that overlaps another class in the same room or with the same instructor
+        start, end = parse_time(data['startTime']), parse_time(data['endTime'])
+        if day_name(data['day']) and start is not None and end is not None:
+            conflicts = db.timetable().conflicts(
+                data['day'], start, end, room=data['room'], instructor=data.get('instructor')
+            )
+            if conflicts:
+                print(f'[ERROR] Routine conflicts with {len(conflicts)} existing routine(s)')
+                return jsonify({'message': 'Routine conflicts with existing routines', 'conflicts': conflicts}), 409
+        
         print('[DEBUG] Creating routine in Google Sheets')
         routine_data = {
             'user_id': user_id,
@@ -113,16 +166,13 @@ def create_routine():
 def delete_routine(routine_id):
     """Delete routine (admin only)"""
     try:
-        db = GoogleSheetsDB()
-        identity = get_jwt_identity()
-        user_id = int(str(identity).strip()) if identity else None
+        db = get_db()
+        identity = current_identity()
         
-        if not user_id:
+        if identity is None:
             return jsonify({'message': 'Invalid token'}), 401
         
-        user = db.find_user_by_id(user_id)
-        
-        if not user or user.get('Role', 'student') != 'admin':
+        if not identity.is_admin:
             return jsonify({'message': 'Unauthorized'}), 403
         
         success = db.delete_routine(routine_id)
@@ -3,9 +3,14 @@ User management routes - Using Google Sheets
 """
 
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.google_sheets_db import GoogleSheetsDB
+from flask_jwt_extended import jwt_required
+from app.database import get_db
+from app.identity import current_identity
+from app.pagination import page_params, page_response
+from app.token_revocation import revoke_user_tokens
+from app.user_import import IMPORT_MAX_ROWS, UserImporter, read_rows
 from werkzeug.security import generate_password_hash
+from datetime import datetime
 
 users_bp = Blueprint('users', __name__)
 
@@ -14,27 +19,27 @@ users_bp = Blueprint('users', __name__)
 def get_users():
     """Get all users (admin only)"""
     try:
-        db = GoogleSheetsDB()
-        identity = get_jwt_identity()
-        # Handle both string and int identities
-        user_id = int(str(identity).strip()) if identity else None
+        db = get_db()
+        identity = current_identity()
         
-        print(f'[GET_USERS] User ID from token: {user_id}')
-        
-        if not user_id:
+        if identity is None:
             print('[GET_USERS ERROR] Invalid token - no user ID')
             return jsonify({'message': 'Invalid token'}), 401
         
-        user = db.find_user_by_id(user_id)
-        print(f'[GET_USERS] User found: {user is not None}')
-        
-        if user:
-            print(f'[GET_USERS] User role: {user.get("Role")}')
+        print(f'[GET_USERS] User {identity.user_id}, role from token: {identity.role}')
         
-        if not user or user.get('Role', 'student').lower() != 'admin':
-            print(f'[GET_USERS ERROR] Unauthorized. User role: {user.get("Role") if user else "None"}')
+        if not identity.is_admin:
+            print(f'[GET_USERS ERROR] Unauthorized. User role: {identity.role}')
             return jsonify({'message': 'Unauthorized'}), 403
         
+        try:
+            page = page_params()
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        if page is not None:
+            items, next_cursor = db.get_users_page(*page)
+            return page_response(items, next_cursor), 200
+        
         users = db.get_all_users()
         print(f'[GET_USERS] Returning {len(users)} users')
         return jsonify(users), 200
@@ -44,50 +49,137 @@ def get_users():
         traceback.print_exc()
         return jsonify({'message': f'Error: {str(e)}'}), 500
 
+def _import_source():
+    """(stream, format) of an uploaded import: multipart 'file' or a raw CSV/JSON Lines body"""
+    fmt = request.args.get('format')
+    upload = request.files.get('file')
+    if upload is not None:
+        name = (upload.filename or '').lower()
+        if not fmt:
+            fmt = 'csv' if name.endswith('.csv') else 'jsonl' if name.endswith(('.jsonl', '.ndjson')) else None
+        return upload.stream, fmt
+    if not fmt:
+        content_type = (request.mimetype or '').lower()
+        fmt = 'csv' if content_type == 'text/csv' else 'jsonl' if content_type in (
+            'application/x-ndjson', 'application/jsonl', 'application/x-jsonlines') else None
+    return request.stream, fmt
+
+@users_bp.route('/import', methods=['POST'])
+@jwt_required()
+def import_users():
+    """Bulk-create users from a CSV or JSON Lines upload (admin only)"""
+    try:
+        db = get_db()
+        identity = current_identity()
+        
+        if identity is None:
+            return jsonify({'message': 'Invalid token'}), 401
+        
+        if not identity.is_admin:
+            return jsonify({'message': 'Unauthorized'}), 403
+        
+        stream, fmt = _import_source()
+        if fmt not in ('csv', 'jsonl'):
+            return jsonify({'message': 'Upload a .csv or .jsonl file, or pass ?format=csv|jsonl'}), 400
+        
+        dry_run = request.args.get('dry_run', '').lower() in ('1', 'true', 'yes')
+        try:
+            start_line = int(request.args.get('start_line', 0))
+        except ValueError:
+            return jsonify({'message': 'start_line must be an integer'}), 400
+        # Capped per request; send the same file again with ?start_line=<next_line> to go on
+        rows = ((line, raw) for line, raw in read_rows(stream, fmt) if line >= start_line)
+        report = UserImporter(db, dry_run=dry_run, max_rows=IMPORT_MAX_ROWS).run(rows)
+        print(f"[IMPORT] {report['created']} users created, {report['failed']} rows rejected")
+        return jsonify(report), 201 if report['created'] and not dry_run else 200
+    except Exception as e:
+        print(f'[ERROR] import_users: {e}')
+        return jsonify({'message': f'Error: {str(e)}'}), 500
+
 @users_bp.route('/<int:user_id>', methods=['GET'])
 @jwt_required()
 def get_user(user_id):
     """Get specific user"""
     try:
-        db = GoogleSheetsDB()
-        identity = get_jwt_identity()
-        current_user_id = int(str(identity).strip()) if identity else None
+        db = get_db()
+        identity = current_identity()
         
-        if not current_user_id:
+        if identity is None:
             return jsonify({'message': 'Invalid token'}), 401
         
-        user = db.find_user_by_id(user_id)
+        # Users can only view their own profile unless they're admin
+        if not identity.is_admin and identity.user_id != user_id:
+            return jsonify({'message': 'Unauthorized'}), 403
+        
+        user = identity.user if identity.user_id == user_id else db.find_user_by_id(user_id)
         
         if not user:
             return jsonify({'message': 'User not found'}), 404
         
-        # Users can only view their own profile unless they're admin
-        current_user = db.find_user_by_id(current_user_id)
-        if current_user.get('Role', 'student').lower() != 'admin' and current_user_id != user_id:
-            return jsonify({'message': 'Unauthorized'}), 403
-        
         return jsonify(user), 200
     except Exception as e:
         print(f'[ERROR] get_user: {e}')
         return jsonify({'message': f'Error: {str(e)}'}), 500
 
+@users_bp.route('/<int:user_id>/overview', methods=['GET'])
+@jwt_required()
+def get_user_overview(user_id):
+    """Profile, today's classes, results and attendance summary in one response.
+
+    The reads touch different sheets, so they run concurrently (the response costs the
+    slowest one, not the sum); a part that fails or times out is listed under 'errors'.
+    """
+    try:
+        db = get_db()
+        identity = current_identity()
+        
+        if identity is None:
+            return jsonify({'message': 'Invalid token'}), 401
+        
+        # Users can only view their own overview unless they're admin
+        if not identity.is_admin and identity.user_id != user_id:
+            return jsonify({'message': 'Unauthorized'}), 403
+        
+        user = identity.user if identity.user_id == user_id else db.find_user_by_id(user_id)
+        if not user:
+            return jsonify({'message': 'User not found'}), 404
+        
+        today = datetime.now().strftime('%A')
+        student_id = user.get('Student ID')
+        parts, errors = db.fan_out({
+            'routines': lambda: db.timetable().day(today),
+            'results': lambda: db.get_user_results(user_id),
+            'attendance': lambda: db.get_attendance_summary(student_id=student_id) if student_id else []
+        })
+        
+        profile = {k: v for k, v in user.items() if k != 'Password'}
+        return jsonify({
+            'user': profile,
+            'today': {'day': today, 'routines': parts.get('routines', [])},
+            'results': parts.get('results', []),
+            'attendance': parts.get('attendance', []),
+            'errors': errors
+        }), 200
+    except Exception as e:
+        print(f'[ERROR] get_user_overview: {e}')
+        return jsonify({'message': f'Error: {str(e)}'}), 500
+
 @users_bp.route('/<int:user_id>', methods=['PUT'])
 @jwt_required()
 def update_user(user_id):
     """Update user profile"""
     try:
-        db = GoogleSheetsDB()
-        identity = get_jwt_identity()
-        current_user_id = int(str(identity).strip()) if identity else None
+        db = get_db()
+        identity = current_identity()
         
-        if not current_user_id:
+        if identity is None:
             return jsonify({'message': 'Invalid token'}), 401
         
         # Users can only update their own profile
-        if current_user_id != user_id:
+        if identity.user_id != user_id:
             return jsonify({'message': 'Unauthorized'}), 403
         
-        user = db.find_user_by_id(user_id)
+        user = identity.user
         if not user:
             return jsonify({'message': 'User not found'}), 404
         
@@ -102,11 +194,10 @@ def update_user(user_id):
         if 'contact_number' in data:
             update_data['Phone'] = data['contact_number']
         
-        # Update in database
-        result = db.update_user(user_id, update_data)
+        # Update in database - returns the record as written, no re-read needed
+        updated_user = db.update_user(user_id, update_data)
         
-        if result:
-            updated_user = db.find_user_by_id(user_id)
+        if updated_user:
             return jsonify({
                 'message': 'User updated successfully',
                 'user': updated_user
@@ -118,3 +209,23 @@ def update_user(user_id):
         import traceback
         traceback.print_exc()
         return jsonify({'message': f'Error: {str(e)}'}), 500
+
+@users_bp.route('/<int:user_id>/revoke-tokens', methods=['POST'])
+@jwt_required()
+def revoke_tokens(user_id):
+    """Force a user to sign in again: revokes every token issued to them so far (admin only)"""
+    try:
+        db = get_db()
+        identity = current_identity()
+        
+        if identity is None or not identity.is_admin:
+            return jsonify({'message': 'Unauthorized'}), 403
+        
+        if not db.find_user_by_id(user_id):
+            return jsonify({'message': 'User not found'}), 404
+        
+        revoke_user_tokens(user_id)
+        return jsonify({'message': 'All sessions for this user were signed out'}), 200
+    except Exception as e:
+        print(f'[ERROR] revoke_tokens: {e}')
+        return jsonify({'message': f'Error: {str(e)}'}), 500
@@ -0,0 +1,75 @@
+"""
+Worksheet metadata cache
+Lists every worksheet of the spreadsheet in one metadata call and serves
+worksheet handles from memory, so resolving a sheet by name costs no API call.
+"""
+import threading
+import time
+
+from gspread.exceptions import WorksheetNotFound
+
+
+class WorksheetCatalog:
+    """Worksheet handles by title, refreshed only when a lookup misses"""
+
+    # A miss re-lists the worksheets at most this often, so asking for a
+    # sheet that does not exist cannot turn into a metadata call per request
+    MISS_REFRESH_SECONDS = 10
+
+    def __init__(self, spreadsheet):
+        self.spreadsheet = spreadsheet
+        self._by_title = {}
+        self._aliases = {}      # tuple of accepted names -> resolved title
+        self._refreshed_at = float('-inf')
+        self._lock = threading.Lock()
+        self.refreshes = 0
+
+    def refresh(self):
+        """Re-list all worksheets with a single metadata fetch"""
+        worksheets = self.spreadsheet.worksheets()
+        with self._lock:
+            self._by_title = {ws.title: ws for ws in worksheets}
+            self._aliases = {}
+            self._refreshed_at = time.monotonic()
+            self.refreshes += 1
+
+    def _match(self, names):
+        alias = self._aliases.get(names)
+        if alias is not None and alias in self._by_title:
+            return self._by_title[alias]
+        for name in names:
+            worksheet = self._by_title.get(name)
+            if worksheet is not None:
+                self._aliases[names] = worksheet.title
+                return worksheet
+        return None
+
+    def get(self, *names):
+        """Worksheet matching the first of several accepted names (e.g. 'Users', 'User').
+
+        Raises WorksheetNotFound when none of them exists.
+        """
+        with self._lock:
+            worksheet = self._match(names)
+            can_refresh = time.monotonic() - self._refreshed_at >= self.MISS_REFRESH_SECONDS
+        if worksheet is None and can_refresh:
+            self.refresh()
+            with self._lock:
+                worksheet = self._match(names)
+        if worksheet is None:
+            raise WorksheetNotFound(' / '.join(names))
+        return worksheet
+
+    def find(self, *names):
+        """Like get(), but returns None for a missing sheet"""
+        try:
+            return self.get(*names)
+        except WorksheetNotFound:
+            return None
+
+    def titles(self):
+        """Titles of all worksheets, listing them first if never loaded"""
+        if self._refreshed_at == float('-inf'):
+            self.refresh()
+        with self._lock:
+            return list(self._by_title)
@@ -0,0 +1,217 @@
+"""
+Read-through cache for worksheet records
+Keeps recently read sheets in memory with a TTL and an LRU memory cap.
+Expired entries stay around until evicted so they can be revalidated
+or extended with a tail read instead of being downloaded again.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+def estimate_size(records):
+    """Rough memory footprint of a list of record dicts, in bytes"""
+    size = 64
+    for record in records:
+        size += 64
+        for key, value in record.items():
+            size += 50 + len(str(key)) + len(str(value))
+    return size
+
+
+class TableCache:
+    """Thread-safe TTL + LRU cache of worksheet records keyed by worksheet title"""
+
+    def __init__(self, ttl=30, max_bytes=32 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.full_loads = 0
+        self.revalidations = 0
+        self.tail_loads = 0
+
+    def get(self, key):
+        """Return cached records for a worksheet, or None when missing/expired"""
+        return self.lookup(key)[0]
+
+    def lookup(self, key):
+        """Return (records or None, version) read under one lock"""
+        with self._lock:
+            version = self._versions.get(key, 0)
+            entry = self._entries.get(key)
+            if entry is None or entry['expires'] <= time.monotonic():
+                self.misses += 1
+                return None, version
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry['records'], version
+
+    def stale(self, key):
+        """Return an entry even if it has expired, or None.
+
+        The dict holds records, length (row count at inspection), version, loaded_at
+        (monotonic time of the last full read) and modified (the change marker seen
+        when it was last checked).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            return {
+                'records': entry['records'],
+                'length': len(entry['records']),
+                'version': self._versions.get(key, 0),
+                'loaded_at': entry['loaded_at'],
+                'modified': entry['modified']
+            }
+
+    def put(self, key, records, modified=None):
+        """Store freshly read records; returns the new worksheet version"""
+        size = estimate_size(records)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            version = self._versions[key] = self._versions.get(key, 0) + 1
+            self.full_loads += 1
+            if size > self.max_bytes:
+                return version
+            now = time.monotonic()
+            self._entries[key] = {
+                'records': records,
+                'expires': now + self.ttl,
+                'loaded_at': now,
+                'modified': modified,
+                'size': size
+            }
+            self._bytes += size
+            self._evict()
+            return version
+
+    def touch(self, key, version, modified=None):
+        """Keep an expired entry for another TTL after confirming it is unchanged.
+
+        Returns the version, or None if the entry changed since it was inspected.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._versions.get(key, 0) != version:
+                return None
+            entry['expires'] = time.monotonic() + self.ttl
+            if modified is not None:
+                entry['modified'] = modified
+            self._entries.move_to_end(key)
+            self.revalidations += 1
+            return self._versions.get(key, 0)
+
+    def extend(self, key, version, length, records, modified=None):
+        """Add rows found by a tail read of a `length`-row entry; None if the entry changed since"""
+        size = estimate_size(records) - 64
+        with self._lock:
+            entry = self._entries.get(key)
+            if (entry is None or self._versions.get(key, 0) != version
+                    or len(entry['records']) != length):
+                return None
+            entry['records'].extend(records)
+            entry['size'] += size
+            entry['expires'] = time.monotonic() + self.ttl
+            entry['modified'] = modified
+            self._bytes += size
+            self._entries.move_to_end(key)
+            version = self._versions[key] = self._versions.get(key, 0) + 1
+            self.tail_loads += 1
+            self._evict()
+            return version
+
+    def append(self, key, record, position=None):
+        """Write-through a newly appended row; False if the sheet is not cached.
+
+        With a position (0-based record index the sheet reported for the row), the
+        row is only applied when it lands right after the cached rows.
+        """
+        size = estimate_size([record]) - 64
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            if position is not None and position != len(entry['records']):
+                return False
+            entry['records'].append(record)
+            entry['size'] += size
+            self._bytes += size
+            self._evict()
+            return True
+
+    def replace(self, key, position, record):
+        """Write-through an updated row at a 0-based record position"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or position >= len(entry['records']):
+                return False
+            size = estimate_size([record]) - estimate_size([entry['records'][position]])
+            entry['records'][position] = record
+            entry['size'] += size
+            self._bytes += size
+            self._evict()
+            return True
+
+    def expire(self, key):
+        """Force a revalidation on next read but keep the rows for a tail read (after appends)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry['expires'] = 0
+                entry['modified'] = None
+            # Bumped so a tail read already in flight does not extend over our write
+            self._versions[key] = self._versions.get(key, 0) + 1
+            self.invalidations += 1
+
+    def invalidate(self, key=None):
+        """Forget one worksheet (or everything) after a write"""
+        with self._lock:
+            keys = [key] if key is not None else list(self._entries)
+            for k in keys:
+                if k in self._entries:
+                    self._drop(k)
+                self._versions[k] = self._versions.get(k, 0) + 1
+            self.invalidations += 1
+
+    def version(self, key):
+        """Counter that changes every time a worksheet's cached rows are replaced or extended"""
+        with self._lock:
+            return self._versions.get(key, 0)
+
+    def stats(self):
+        """Hit/miss counters and memory usage for sizing the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'full_loads': self.full_loads,
+                'revalidations': self.revalidations,
+                'tail_loads': self.tail_loads
+            }
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry['size']
@@ -0,0 +1,56 @@
+"""
+Single-flight coalescing of identical reads
+Concurrent callers asking for the same key share one in-flight call and all
+receive its result (or its exception), instead of each hitting the API.
+"""
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Per-key in-flight calls; the first caller runs the call, later ones wait for it"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leads = 0
+        self.shared = 0
+
+    def begin(self, key):
+        """Return (future, is_leader). The leader must call finish() for the key."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.shared += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self.leads += 1
+            return future, True
+
+    def finish(self, key, future, result=None, error=None):
+        """Publish the leader's result (or error) to every waiter and close the flight"""
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, fn):
+        """Run fn() once for all concurrent callers of the same key"""
+        future, leader = self.begin(key)
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self.finish(key, future, error=e)
+            raise
+        self.finish(key, future, result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {'in_flight': len(self._calls), 'leads': self.leads, 'shared': self.shared}
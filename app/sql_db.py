@@ -0,0 +1,688 @@
+"""
+SQLAlchemy storage backend
+Serves the same operations as GoogleSheetsDB from the models in app.models,
+for deployments that outgrow the Google Sheets API quotas.
+"""
+import functools
+from datetime import datetime
+
+from sqlalchemy import and_, case, func, inspect, or_, text
+
+from app import db
+from app.models import User, Routine, Attendance, Result
+from app.attendance_summary import STATUSES, summary_row
+from app.pagination import encode_cursor
+from app.storage import StorageBackend
+from app.timetable import day_name
+
+# Sheets column name -> User model attribute, for update_user
+USER_FIELDS = {
+    'Full Name': 'full_name',
+    'Email': 'email',
+    'Password': 'password_hash',
+    'Student ID': 'student_id',
+    'Phone': 'contact_number',
+    'Role': 'role',
+    'Section': 'section',
+    'Parent Email': 'parent_email'
+}
+
+
+def _in_app_context(method):
+    """Run a backend method inside the app context so it also works from worker threads"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.app.app_context():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _parse_date(value):
+    if not value:
+        return datetime.now().date()
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    return value
+
+
+def _iso(value):
+    return value.isoformat() if value else ''
+
+
+def user_record(user):
+    """User row in the Users sheet layout"""
+    return {
+        'ID': user.id,
+        'Full Name': user.full_name,
+        'Email': user.email,
+        'Password': user.password_hash,
+        'Student ID': user.student_id,
+        'Phone': user.contact_number or '',
+        'Role': user.role or 'student',
+        'Section': user.section or '',
+        'is_active': 'true' if user.is_active else 'false',
+        'created_at': _iso(user.created_at),
+        'Parent Email': user.parent_email or ''
+    }
+
+
+def routine_record(routine):
+    """Routine in the normalized shape get_all_routines() returns"""
+    return {
+        'id': routine.id,
+        'user_id': routine.user_id or '',
+        'day': routine.day,
+        'start_time': routine.start_time,
+        'end_time': routine.end_time,
+        'subject': routine.subject,
+        'instructor_name': routine.instructor_name or '',
+        'room_number': routine.room_number
+    }
+
+
+def subject_attendance_record(attendance, student_id):
+    """Attendance row in the subject sheet layout"""
+    return {
+        'Student ID': student_id,
+        'Date': _iso(attendance.date),
+        'Status': attendance.status,
+        'Subject': attendance.subject
+    }
+
+
+def result_record(result):
+    """Result row in the Results sheet layout"""
+    return {
+        'ID': result.id,
+        'User ID': result.student_id,
+        'Subject': result.subject,
+        'Marks': result.marks,
+        'Grade': result.grade,
+        'Date': _iso(result.date),
+        'created_at': _iso(result.created_at)
+    }
+
+
+def _keyset_page(query, model, limit, cursor, to_record):
+    """One page of a query in ID order after the ID `cursor`; returns (records, next_cursor)"""
+    if cursor is not None:
+        query = query.filter(model.id > int(cursor))
+    rows = query.order_by(model.id).limit(limit + 1).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return [to_record(row) for row in rows], (encode_cursor(rows[-1].id) if more else None)
+
+
+def _attendance_query(student_id=None, subject=None, date_from=None, date_to=None, status=None):
+    """(Attendance, Student ID) rows matching the query_attendance() filters, unordered"""
+    query = (db.session.query(Attendance, User.student_id)
+             .join(User, Attendance.student_id == User.id))
+    if student_id is not None:
+        query = query.filter(User.student_id == str(student_id).strip())
+    if subject:
+        query = query.filter(func.lower(Attendance.subject) == subject.lower())
+    if date_from:
+        query = query.filter(Attendance.date >= _parse_date(date_from))
+    if date_to:
+        query = query.filter(Attendance.date <= _parse_date(date_to))
+    if status:
+        query = query.filter(func.lower(Attendance.status) == status.lower())
+    return query
+
+
+def legacy_attendance_record(attendance):
+    """Attendance row in the legacy Attendance sheet layout"""
+    return {
+        'ID': attendance.id,
+        'User ID': attendance.student_id,
+        'Subject': attendance.subject,
+        'Status': attendance.status,
+        'Date': _iso(attendance.date),
+        'created_at': _iso(attendance.created_at)
+    }
+
+
+class SQLAlchemyDB(StorageBackend):
+    """Storage backend on the SQLAlchemy models"""
+
+    def __init__(self, app):
+        super().__init__()
+        self.app = app
+        with app.app_context():
+            db.create_all()
+            self._migrate()
+
+    @staticmethod
+    def _migrate():
+        """Bring tables created by an older version of the models up to date.
+
+        create_all() only creates missing tables, so columns and indexes added to the
+        models since (User.section, Routine.user_id, Result.date, ...) are added here.
+        """
+        inspector = inspect(db.engine)
+        with db.engine.begin() as conn:
+            for table in db.metadata.sorted_tables:
+                if not inspector.has_table(table.name):
+                    continue
+                existing = {column['name'] for column in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name in existing:
+                        continue
+                    if not column.nullable and column.server_default is None:
+                        raise RuntimeError(
+                            f"Table '{table.name}' has no '{column.name}' column and it cannot be "
+                            f"added automatically (NOT NULL); migrate the database by hand"
+                        )
+                    column_type = column.type.compile(dialect=db.engine.dialect)
+                    print(f"[DEBUG] Adding column {table.name}.{column.name}")
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                for index in table.indexes:
+                    index.create(bind=conn, checkfirst=True)
+
+    def _fail(self, action, error):
+        print(f"[ERROR] Failed to {action}: {error}")
+        db.session.rollback()
+
+    # ==================== USER OPERATIONS ====================
+
+    @_in_app_context
+    def get_all_users(self):
+        """Get all users"""
+        try:
+            return [user_record(u) for u in User.query.order_by(User.id).all()]
+        except Exception as e:
+            self._fail('get users', e)
+            return []
+
+    @_in_app_context
+    def get_users_page(self, limit, cursor=None):
+        """One page of users in ID order"""
+        try:
+            return _keyset_page(User.query, User, limit, cursor, user_record)
+        except ValueError:
+            raise
+        except Exception as e:
+            self._fail('get users page', e)
+            return [], None
+
+    @_in_app_context
+    def find_user_by_email(self, email):
+        """Find user by email (emails are stored lowercase, so the index is used)"""
+        try:
+            user = User.query.filter_by(email=str(email).strip().lower()).first()
+            return user_record(user) if user else None
+        except Exception as e:
+            self._fail('find user by email', e)
+            return None
+
+    @_in_app_context
+    def find_user_by_id(self, user_id):
+        """Find user by ID"""
+        try:
+            user = db.session.get(User, int(str(user_id).strip()))
+            return user_record(user) if user else None
+        except Exception as e:
+            self._fail('find user by ID', e)
+            return None
+
+    @_in_app_context
+    def find_user_by_student_id(self, student_id):
+        """Find user by Student ID"""
+        try:
+            user = User.query.filter_by(student_id=str(student_id).strip()).first()
+            return user_record(user) if user else None
+        except Exception as e:
+            self._fail('find user by Student ID', e)
+            return None
+
+    @_in_app_context
+    def add_user(self, user_data):
+        """Add a new user"""
+        try:
+            user = User(
+                full_name=user_data.get('name', ''),
+                email=str(user_data.get('email', '')).strip().lower(),
+                password_hash=user_data.get('password', ''),
+                student_id=str(user_data.get('student_id', '')),
+                contact_number=user_data.get('phone', ''),
+                role=user_data.get('role', 'student'),
+                section=user_data.get('section', ''),
+                is_active=True
+            )
+            db.session.add(user)
+            db.session.commit()
+            return {
+                'id': user.id,
+                'name': user_data.get('name'),
+                'email': user_data.get('email'),
+                'student_id': user_data.get('student_id'),
+                'phone': user_data.get('phone'),
+                'role': user_data.get('role', 'student'),
+                'section': user_data.get('section'),
+                'is_active': True
+            }
+        except Exception as e:
+            self._fail('add user', e)
+            return None
+
+    @_in_app_context
+    def add_users_bulk(self, users_data):
+        """Add many users in one commit"""
+        try:
+            users = [
+                User(
+                    full_name=user_data.get('name', ''),
+                    email=str(user_data.get('email', '')).strip().lower(),
+                    password_hash=user_data.get('password', ''),
+                    student_id=str(user_data.get('student_id', '')),
+                    contact_number=user_data.get('phone', ''),
+                    role=user_data.get('role', 'student'),
+                    section=user_data.get('section', ''),
+                    is_active=True
+                )
+                for user_data in users_data
+            ]
+            db.session.add_all(users)
+            db.session.commit()
+            return [
+                {
+                    'id': user.id,
+                    'name': user_data.get('name'),
+                    'email': user_data.get('email'),
+                    'student_id': user_data.get('student_id'),
+                    'phone': user_data.get('phone'),
+                    'role': user_data.get('role', 'student'),
+                    'section': user_data.get('section'),
+                    'is_active': True
+                }
+                for user, user_data in zip(users, users_data)
+            ]
+        except Exception as e:
+            self._fail('add users', e)
+            return None
+
+    @_in_app_context
+    def update_user(self, user_id, update_data):
+        """Update user profile fields; returns the updated record"""
+        try:
+            user = db.session.get(User, int(user_id))
+            if not user:
+                print(f"[ERROR] User with ID {user_id} not found")
+                return False
+            for field_name, field_value in update_data.items():
+                if field_name in USER_FIELDS:
+                    setattr(user, USER_FIELDS[field_name], field_value)
+            db.session.commit()
+            return user_record(user)
+        except Exception as e:
+            self._fail('update user', e)
+            return False
+
+    # ==================== ROUTINE OPERATIONS ====================
+
+    @_in_app_context
+    def get_all_routines(self):
+        """Get all routines"""
+        try:
+            return [routine_record(r) for r in Routine.query.order_by(Routine.id).all()]
+        except Exception as e:
+            self._fail('get routines', e)
+            return []
+
+    @_in_app_context
+    def get_routines_page(self, limit, cursor=None, day=None):
+        """One page of routines in ID order, optionally for one day"""
+        try:
+            query = Routine.query
+            if day:
+                # Stored spellings that normalize to the requested weekday ('Mon', 'monday', ...)
+                day = day_name(day)
+                spellings = [value for (value,) in db.session.query(Routine.day).distinct()
+                             if day is not None and day_name(value) == day]
+                query = query.filter(Routine.day.in_(spellings))
+            return _keyset_page(query, Routine, limit, cursor, routine_record)
+        except ValueError:
+            raise
+        except Exception as e:
+            self._fail('get routines page', e)
+            return [], None
+
+    @_in_app_context
+    def get_user_routines(self, user_id):
+        """Get routines for a specific user"""
+        try:
+            routines = Routine.query.filter_by(user_id=int(user_id)).order_by(Routine.id).all()
+            return [routine_record(r) for r in routines]
+        except Exception as e:
+            self._fail('get user routines', e)
+            return []
+
+    @_in_app_context
+    def add_routine(self, routine_data):
+        """Add a new routine"""
+        try:
+            routine = Routine(
+                user_id=routine_data.get('user_id') or None,
+                day=routine_data.get('day', ''),
+                start_time=routine_data.get('start_time', ''),
+                end_time=routine_data.get('end_time', ''),
+                subject=routine_data.get('subject', ''),
+                instructor_name=routine_data.get('instructor_name', ''),
+                room_number=routine_data.get('room_number', '')
+            )
+            db.session.add(routine)
+            db.session.commit()
+            return routine_record(routine)
+        except Exception as e:
+            self._fail('add routine', e)
+            return None
+
+    @_in_app_context
+    def delete_routine(self, routine_id):
+        """Delete a routine by ID"""
+        try:
+            routine = db.session.get(Routine, int(routine_id))
+            if not routine:
+                return False
+            db.session.delete(routine)
+            db.session.commit()
+            return True
+        except Exception as e:
+            self._fail('delete routine', e)
+            return False
+
+    # ==================== ATTENDANCE OPERATIONS ====================
+
+    @_in_app_context
+    def get_all_attendance(self):
+        """Get all attendance records (legacy Attendance sheet layout)"""
+        try:
+            return [legacy_attendance_record(a) for a in Attendance.query.order_by(Attendance.id).all()]
+        except Exception as e:
+            self._fail('get attendance', e)
+            return []
+
+    @_in_app_context
+    def get_attendance_page(self, limit, cursor=None, subject=None):
+        """One page of attendance records (legacy Attendance sheet layout) in ID order"""
+        try:
+            query = Attendance.query
+            if subject:
+                query = query.filter(func.lower(Attendance.subject) == subject.lower())
+            return _keyset_page(query, Attendance, limit, cursor, legacy_attendance_record)
+        except ValueError:
+            raise
+        except Exception as e:
+            self._fail('get attendance page', e)
+            return [], None
+
+    @_in_app_context
+    def get_user_attendance(self, user_id):
+        """Get attendance records for a specific user across all subjects"""
+        try:
+            user = db.session.get(User, int(user_id))
+            if not user:
+                return []
+            rows = (Attendance.query
+                    .filter(Attendance.student_id == user.id)
+                    .order_by(Attendance.subject, Attendance.date, Attendance.id)
+                    .all())
+            return [subject_attendance_record(a, user.student_id) for a in rows]
+        except Exception as e:
+            self._fail('get user attendance', e)
+            return []
+
+    @_in_app_context
+    def query_attendance(self, student_id=None, subject=None, date_from=None, date_to=None, status=None):
+        """Attendance matching the filters (dates as YYYY-MM-DD, inclusive), filtered by the database"""
+        try:
+            query = _attendance_query(student_id, subject, date_from, date_to, status)
+            rows = query.order_by(Attendance.subject, Attendance.date, Attendance.id).all()
+            return [subject_attendance_record(a, sid) for a, sid in rows]
+        except Exception as e:
+            self._fail('query attendance', e)
+            return []
+
+    @_in_app_context
+    def query_attendance_page(self, limit, cursor=None, subject=None, **filters):
+        """One page of query_attendance() results; the cursor is the last [subject, date, id] served"""
+        query = _attendance_query(subject=subject, **filters)
+        if cursor is not None:
+            try:
+                last_subject, last_date, last_id = cursor
+                last_date, last_id = _parse_date(last_date), int(last_id)
+            except (TypeError, ValueError):
+                raise ValueError('Invalid cursor')
+            query = query.filter(or_(
+                Attendance.subject > last_subject,
+                and_(Attendance.subject == last_subject, or_(
+                    Attendance.date > last_date,
+                    and_(Attendance.date == last_date, Attendance.id > last_id)
+                ))
+            ))
+        try:
+            rows = (query.order_by(Attendance.subject, Attendance.date, Attendance.id)
+                    .limit(limit + 1).all())
+        except Exception as e:
+            self._fail('query attendance page', e)
+            return [], None
+        more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if more:
+            last = rows[-1][0]
+            next_cursor = encode_cursor([last.subject, _iso(last.date), last.id])
+        return [subject_attendance_record(a, sid) for a, sid in rows], next_cursor
+
+    def iter_attendance(self, subject=None):
+        """Yield attendance records subject by subject, fetched from the database in batches"""
+        with self.app.app_context():
+            query = (db.session.query(Attendance, User.student_id)
+                     .join(User, Attendance.student_id == User.id))
+            if subject:
+                query = query.filter(func.lower(Attendance.subject) == subject.lower())
+            query = query.order_by(Attendance.subject, Attendance.date, Attendance.id)
+            for attendance, student_id in query.yield_per(1000):
+                yield subject_attendance_record(attendance, student_id)
+
+    @_in_app_context
+    def get_attendance_by_subject(self, subject):
+        """Get all attendance records for a specific subject"""
+        try:
+            rows = (db.session.query(Attendance, User.student_id)
+                    .join(User, Attendance.student_id == User.id)
+                    .filter(Attendance.subject == subject)
+                    .order_by(Attendance.date, Attendance.id)
+                    .all())
+            return [subject_attendance_record(a, student_id) for a, student_id in rows]
+        except Exception as e:
+            self._fail(f'get attendance for subject {subject}', e)
+            return []
+
+    @_in_app_context
+    def get_all_attendance_subjects(self):
+        """Get all subjects that have attendance"""
+        try:
+            recorded = {s for (s,) in db.session.query(Attendance.subject).distinct()}
+            return list(self.ATTENDANCE_SUBJECTS) + sorted(recorded - set(self.ATTENDANCE_SUBJECTS))
+        except Exception as e:
+            self._fail('get attendance subjects', e)
+            return list(self.ATTENDANCE_SUBJECTS)
+
+    @_in_app_context
+    def add_attendance_to_subject(self, subject, attendance_data):
+        """Add attendance record for a subject"""
+        try:
+            user = None
+            if attendance_data.get('student_id'):
+                user = User.query.filter_by(student_id=str(attendance_data['student_id'])).first()
+            elif attendance_data.get('user_id'):
+                user = db.session.get(User, int(attendance_data['user_id']))
+            if not user:
+                print(f"[ERROR] Failed to add attendance to {subject}: unknown student")
+                return None
+
+            attendance = Attendance(
+                student_id=user.id,
+                subject=subject,
+                date=_parse_date(attendance_data.get('date')),
+                status=attendance_data.get('status', 'Absent'),
+                marked_by=attendance_data.get('marked_by')
+            )
+            db.session.add(attendance)
+            db.session.commit()
+            return {
+                'subject': subject,
+                'student_id': user.student_id,
+                'date': _iso(attendance.date),
+                'status': attendance.status
+            }
+        except Exception as e:
+            self._fail(f'add attendance to {subject}', e)
+            return None
+
+    @_in_app_context
+    def add_attendance_bulk(self, subject, date, entries):
+        """Mark a whole class session: one query resolves the students, one commit writes the rows"""
+        student_ids = {str(e.get('student_id')).strip() for e in entries if isinstance(e, dict) and e.get('student_id')}
+        user_ids = {int(e['user_id']) for e in entries
+                    if isinstance(e, dict) and str(e.get('user_id', '')).strip().isdigit()}
+        try:
+            users = User.query.filter(or_(User.student_id.in_(student_ids), User.id.in_(user_ids))).all()
+        except Exception as e:
+            self._fail('load students for bulk attendance', e)
+            users = []
+        by_student_id = {u.student_id: u for u in users if u.student_id}
+        by_id = {str(u.id): u for u in users}
+        models = {}
+
+        def find_user(user_id, student_id):
+            user = by_student_id.get(student_id) if student_id else by_id.get(user_id)
+            if user is None:
+                return None
+            models[user.student_id] = user
+            return user_record(user)
+
+        outcomes, accepted = self._check_attendance_entries(entries, find_user)
+        if not accepted:
+            return outcomes
+        try:
+            day = _parse_date(date)
+            db.session.add_all([
+                Attendance(student_id=models[user['Student ID']].id, subject=subject, date=day, status=status)
+                for _, user, status in accepted
+            ])
+            db.session.commit()
+            for index, _, status in accepted:
+                outcomes[index].update(ok=True, status=status)
+        except Exception as e:
+            self._fail(f'add bulk attendance to {subject}', e)
+            for index, _, _ in accepted:
+                outcomes[index]['error'] = 'Failed to write attendance'
+        return outcomes
+
+    @_in_app_context
+    def get_attendance_summary(self, student_id=None, subject=None):
+        """Present/absent/late counts and percentage per (Student ID, subject), counted by the database"""
+        try:
+            status = func.lower(Attendance.status)
+            query = (db.session.query(
+                        User.student_id,
+                        Attendance.subject,
+                        *[func.sum(case((status == s, 1), else_=0)) for s in STATUSES],
+                        func.count(Attendance.id),
+                        func.max(Attendance.date))
+                     .join(User, Attendance.student_id == User.id)
+                     .group_by(User.student_id, Attendance.subject)
+                     .order_by(Attendance.subject, User.student_id))
+            if student_id is not None:
+                query = query.filter(User.student_id == str(student_id).strip())
+            if subject:
+                query = query.filter(Attendance.subject == subject)
+            rows = []
+            for sid, subj, present, absent, late, total, last_date in query.all():
+                counts = {
+                    'present': present or 0,
+                    'absent': absent or 0,
+                    'late': late or 0,
+                    'other': total - (present or 0) - (absent or 0) - (late or 0),
+                    'last_date': _iso(last_date)
+                }
+                rows.append(summary_row(sid, subj, counts))
+            return rows
+        except Exception as e:
+            self._fail('get attendance summary', e)
+            return []
+
+    def add_attendance(self, attendance_data):
+        """Add attendance record"""
+        return self.add_attendance_to_subject(attendance_data.get('subject', ''), attendance_data)
+
+    # ==================== RESULTS OPERATIONS ====================
+
+    @_in_app_context
+    def get_all_results(self):
+        """Get all results"""
+        try:
+            return [result_record(r) for r in Result.query.order_by(Result.id).all()]
+        except Exception as e:
+            self._fail('get results', e)
+            return []
+
+    @_in_app_context
+    def get_results_page(self, limit, cursor=None, user_id=None):
+        """One page of results in ID order, optionally for one user"""
+        try:
+            query = Result.query
+            if user_id is not None:
+                query = query.filter(Result.student_id == int(user_id))
+            return _keyset_page(query, Result, limit, cursor, result_record)
+        except ValueError:
+            raise
+        except Exception as e:
+            self._fail('get results page', e)
+            return [], None
+
+    def iter_results(self, user_id=None):
+        """Yield results in ID order, fetched from the database in batches"""
+        with self.app.app_context():
+            query = Result.query
+            if user_id is not None:
+                query = query.filter(Result.student_id == int(user_id))
+            for result in query.order_by(Result.id).yield_per(1000):
+                yield result_record(result)
+
+    @_in_app_context
+    def get_user_results(self, user_id):
+        """Get results for a specific user"""
+        try:
+            results = Result.query.filter_by(student_id=int(user_id)).order_by(Result.id).all()
+            return [result_record(r) for r in results]
+        except Exception as e:
+            self._fail('get user results', e)
+            return []
+
+    @_in_app_context
+    def add_result(self, result_data):
+        """Add result record"""
+        try:
+            result = Result(
+                student_id=int(result_data.get('user_id')),
+                subject=result_data.get('subject', ''),
+                marks=int(result_data.get('marks', 0)),
+                grade=result_data.get('grade', 'F'),
+                date=_parse_date(result_data.get('date'))
+            )
+            db.session.add(result)
+            db.session.commit()
+            return {
+                'id': result.id,
+                'user_id': result_data.get('user_id'),
+                'subject': result_data.get('subject'),
+                'marks': result_data.get('marks'),
+                'grade': result_data.get('grade'),
+                'date': result_data.get('date')
+            }
+        except Exception as e:
+            self._fail('add result', e)
+            return None
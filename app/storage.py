@@ -0,0 +1,237 @@
+"""
+Storage backend interface
+Every backend returns records keyed by the Google Sheets header names
+(ID, Full Name, Email, Student ID, ...) so routes work unchanged on any of them.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from app.attendance_summary import STATUSES
+from app.results_analytics import ResultsAnalytics
+from app.timetable import Timetable
+
+
+class StorageBackend:
+    """Base class for GoogleSheetsDB, InMemorySheetsDB and SQLAlchemyDB"""
+
+    # Subject-wise attendance sheets (Student ID | Date | Status)
+    ATTENDANCE_SUBJECTS = ['Chemistry', 'Math', 'Physics', 'English']
+
+    def __init__(self):
+        self._pool = None   # Thread pool for concurrent fan-out reads, created on first use
+        self._pool_lock = threading.Lock()
+        self._abandoned = 0  # Timed-out fan-out reads still holding a thread
+
+    # ==================== USERS ====================
+    # *_page methods return (items, next_cursor): up to `limit` rows in ID order
+    # after the ID `cursor`, and the cursor for the next page (None on the last page)
+
+    def get_all_users(self):
+        raise NotImplementedError
+
+    def get_users_page(self, limit, cursor=None):
+        raise NotImplementedError
+
+    def find_user_by_email(self, email):
+        raise NotImplementedError
+
+    def find_user_by_id(self, user_id):
+        raise NotImplementedError
+
+    def find_user_by_student_id(self, student_id):
+        raise NotImplementedError
+
+    def add_user(self, user_data):
+        raise NotImplementedError
+
+    def add_users_bulk(self, users_data):
+        """Add many users in one write; returns the created users, or None if nothing was written"""
+        raise NotImplementedError
+
+    def update_user(self, user_id, update_data):
+        raise NotImplementedError
+
+    # ==================== ROUTINES ====================
+
+    def get_all_routines(self):
+        raise NotImplementedError
+
+    def get_routines_page(self, limit, cursor=None, day=None):
+        raise NotImplementedError
+
+    def get_user_routines(self, user_id):
+        raise NotImplementedError
+
+    def add_routine(self, routine_data):
+        raise NotImplementedError
+
+    def delete_routine(self, routine_id):
+        raise NotImplementedError
+
+    # ==================== ATTENDANCE ====================
+
+    def get_all_attendance(self):
+        raise NotImplementedError
+
+    def get_attendance_page(self, limit, cursor=None, subject=None):
+        raise NotImplementedError
+
+    def get_user_attendance(self, user_id):
+        raise NotImplementedError
+
+    def query_attendance(self, student_id=None, subject=None, date_from=None, date_to=None, status=None):
+        raise NotImplementedError
+
+    def query_attendance_page(self, limit, cursor=None, **filters):
+        """One page of query_attendance() in the same order; cursor is a list (see page_params)"""
+        raise NotImplementedError
+
+    def get_attendance_by_subject(self, subject):
+        raise NotImplementedError
+
+    def get_all_attendance_subjects(self):
+        raise NotImplementedError
+
+    def add_attendance_to_subject(self, subject, attendance_data):
+        raise NotImplementedError
+
+    def add_attendance(self, attendance_data):
+        raise NotImplementedError
+
+    def iter_attendance(self, subject=None):
+        """Yield subject attendance records (Student ID, Date, Status, Subject) without loading them all"""
+        raise NotImplementedError
+
+    def add_attendance_bulk(self, subject, date, entries):
+        """Mark a whole class session; returns one outcome per entry, in order"""
+        raise NotImplementedError
+
+    def get_attendance_summary(self, student_id=None, subject=None):
+        raise NotImplementedError
+
+    # ==================== RESULTS ====================
+
+    def get_all_results(self):
+        raise NotImplementedError
+
+    def get_results_page(self, limit, cursor=None, user_id=None):
+        raise NotImplementedError
+
+    def get_user_results(self, user_id):
+        raise NotImplementedError
+
+    def iter_results(self, user_id=None):
+        """Yield Results rows without loading them all"""
+        raise NotImplementedError
+
+    def add_result(self, result_data):
+        raise NotImplementedError
+
+    # ==================== SHARED HELPERS ====================
+
+    FANOUT_WORKERS = int(os.getenv('SHEETS_FANOUT_WORKERS', '4'))
+    # Timed-out reads allowed to keep running before fan-outs start failing fast
+    FANOUT_MAX_ABANDONED = 2 * FANOUT_WORKERS
+
+    def fan_out(self, reads, timeout=10):
+        """Run {name: callable} reads concurrently on a bounded pool.
+
+        Returns (results, errors): results maps name -> value for reads that finished,
+        errors maps name -> message for reads that raised or did not finish in time.
+
+        A read that is already running cannot be cancelled, so on a timeout the pool is
+        retired: the hung read keeps its thread until its call returns, and later fan-outs
+        get fresh threads instead of queueing behind it. At most FANOUT_MAX_ABANDONED such
+        reads are tolerated; beyond that, fan-outs fail fast until some of them return.
+        """
+        with self._pool_lock:
+            if self._abandoned >= self.FANOUT_MAX_ABANDONED:
+                return {}, {name: 'too many earlier reads still running' for name in reads}
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.FANOUT_WORKERS,
+                    thread_name_prefix='storage-read'
+                )
+            pool = self._pool
+
+        futures = {pool.submit(read): name for name, read in reads.items()}
+        done, not_done = wait(futures, timeout=timeout)
+
+        results, errors = {}, {}
+        for future in done:
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                print(f"[ERROR] Fan-out read '{name}' failed: {e}")
+                errors[name] = f"{type(e).__name__}: {e}"
+        stuck = []
+        for future in not_done:
+            errors[futures[future]] = f"timed out after {timeout}s"
+            if not future.cancel():
+                stuck.append(future)
+        if stuck:
+            with self._pool_lock:
+                self._abandoned += len(stuck)
+                if self._pool is pool:
+                    self._pool = None
+            # Queued reads of other callers still run; the threads exit once idle
+            pool.shutdown(wait=False)
+            for future in stuck:
+                future.add_done_callback(self._release_abandoned)
+        return results, errors
+
+    def _release_abandoned(self, future):
+        with self._pool_lock:
+            self._abandoned -= 1
+
+    @staticmethod
+    def _check_attendance_entries(entries, find_user):
+        """Validate bulk attendance entries ({'student_id' or 'user_id', 'status'}).
+
+        `find_user(user_id, student_id)` resolves an entry's student from a snapshot
+        the caller loaded once. Returns (outcomes, accepted): outcomes has one dict per
+        entry (rejected ones already final), accepted holds (index, user, Status) to write.
+        """
+        outcomes, accepted, seen = [], [], set()
+        for index, entry in enumerate(entries):
+            entry = entry if isinstance(entry, dict) else {}
+            student_id = str(entry.get('student_id', '') or '').strip()
+            user_id = str(entry.get('user_id', '') or '').strip()
+            status = str(entry.get('status', '') or '').strip().lower()
+            outcome = {'index': index, 'student_id': student_id or None, 'ok': False}
+            outcomes.append(outcome)
+            user = find_user(user_id or None, student_id or None) if (user_id or student_id) else None
+            if user is None or not user.get('Student ID'):
+                outcome['error'] = 'Student not found'
+                continue
+            outcome['student_id'] = user['Student ID']
+            if status not in STATUSES:
+                outcome['error'] = f"status must be one of {', '.join(STATUSES)}"
+            elif str(user['Student ID']) in seen:
+                outcome['error'] = 'Duplicate entry for this student'
+            else:
+                seen.add(str(user['Student ID']))
+                accepted.append((index, user, status.capitalize()))
+        return outcomes, accepted
+
+    def timetable(self):
+        """Timetable index over all routines (backends that cache routines keep one built)"""
+        return Timetable(self.get_all_routines())
+
+    def results_analytics(self):
+        """GPA, ranks and leaderboards over all results (cached per Results version where possible)"""
+        return ResultsAnalytics(self.get_all_results())
+
+    def warm_up(self):
+        """Pre-load whatever the backend serves from memory (called once per connection)"""
+
+    def cache_stats(self):
+        """Cache counters (backends without a cache report nothing)"""
+        return {}
+
+    def close(self):
+        """Release resources held by the backend"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
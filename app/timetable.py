@@ -0,0 +1,105 @@
+"""
+Timetable index over routines
+Routines by ID and by day, plus per-day intervals sorted by start time, for
+"current/next class" lookups and room/instructor clash checks without
+re-scanning the Routines sheet.
+"""
+import bisect
+from datetime import datetime
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def parse_time(value):
+    """Minutes after midnight for 'HH:MM' (or 'H:MM AM'), None when unreadable"""
+    text = str(value or '').strip().upper()
+    for fmt in ('%H:%M', '%H:%M:%S', '%I:%M %p', '%I:%M%p'):
+        try:
+            parsed = datetime.strptime(text, fmt)
+            return parsed.hour * 60 + parsed.minute
+        except ValueError:
+            continue
+    return None
+
+
+def day_name(value):
+    """Canonical weekday name ('monday', 'Mon' -> 'Monday'), None when unknown"""
+    text = str(value or '').strip().lower()
+    for day in WEEKDAYS:
+        if len(text) >= 3 and day.lower().startswith(text):
+            return day
+    return None
+
+
+class Timetable:
+    """Index over normalized routine dicts (id, day, start_time, end_time, room_number, ...)"""
+
+    def __init__(self, routines, version=None):
+        self.version = version
+        self.by_id = {}
+        self.by_day = {}        # weekday -> routines in sheet order
+        self._slots = {}        # weekday -> [(start, end, routine)] sorted by start
+        for routine in routines:
+            self.by_id[str(routine.get('id', '')).strip()] = routine
+            day = day_name(routine.get('day'))
+            if day is None:
+                continue
+            self.by_day.setdefault(day, []).append(routine)
+            start, end = parse_time(routine.get('start_time')), parse_time(routine.get('end_time'))
+            if start is not None and end is not None:
+                self._slots.setdefault(day, []).append((start, end, routine))
+        self._starts = {}
+        for day, slots in self._slots.items():
+            slots.sort(key=lambda slot: slot[0])
+            self._starts[day] = [slot[0] for slot in slots]
+
+    def find(self, routine_id):
+        """Routine by ID, or None"""
+        routine = self.by_id.get(str(routine_id).strip())
+        return dict(routine) if routine else None
+
+    def day(self, day):
+        """Routines on a weekday, in sheet order"""
+        return [dict(r) for r in self.by_day.get(day_name(day), [])]
+
+    def current(self, day, minute):
+        """Classes in progress on `day` at `minute` after midnight"""
+        day = day_name(day)
+        slots = self._slots.get(day, [])
+        # Only classes that started at or before `minute` can be running
+        started = bisect.bisect_right(self._starts.get(day, []), minute)
+        return [dict(routine) for start, end, routine in slots[:started] if end > minute]
+
+    def upcoming(self, day, minute):
+        """Next classes to start after `minute` on `day`, looking ahead through the week.
+
+        Returns (weekday, routines starting at that time); (None, []) for an empty timetable.
+        """
+        first = WEEKDAYS.index(day_name(day))
+        for offset in range(len(WEEKDAYS) + 1):
+            weekday = WEEKDAYS[(first + offset) % len(WEEKDAYS)]
+            starts = self._starts.get(weekday, [])
+            at = bisect.bisect_right(starts, minute) if offset == 0 else 0
+            if at < len(starts):
+                start = starts[at]
+                end_at = bisect.bisect_right(starts, start)
+                return weekday, [dict(slot[2]) for slot in self._slots[weekday][at:end_at]]
+        return None, []
+
+    def conflicts(self, day, start, end, room=None, instructor=None, exclude_id=None):
+        """Routines on `day` overlapping [start, end) in the same room or with the same instructor"""
+        day = day_name(day)
+        room = str(room or '').strip().lower()
+        instructor = str(instructor or '').strip().lower()
+        slots = self._slots.get(day, [])
+        # Anything starting at or after `end` cannot overlap
+        candidates = slots[:bisect.bisect_left(self._starts.get(day, []), end)]
+        clashes = []
+        for slot_start, slot_end, routine in candidates:
+            if slot_end <= start or str(routine.get('id', '')) == str(exclude_id):
+                continue
+            same_room = room and str(routine.get('room_number', '')).strip().lower() == room
+            same_instructor = instructor and str(routine.get('instructor_name', '')).strip().lower() == instructor
+            if same_room or same_instructor:
+                clashes.append(dict(routine, conflict='room' if same_room else 'instructor'))
+        return clashes
@@ -0,0 +1,248 @@
+"""
+JWT revocation (logout and forced sign-out)
+Revoked token IDs (JTIs) and per-user "revoked before" cut-offs live in a SQLite
+file shared by every worker process on the host, each kept until the tokens it
+covers have expired anyway. Every process keeps a Bloom filter of the revoked
+JTIs plus the cut-offs in memory, so the common case - a token that was never
+revoked - is answered without touching the store. Only a Bloom filter hit is
+confirmed against SQLite. Processes pick up each other's revocations by reading
+the rows added since their last sync, at most every sync_seconds.
+"""
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from flask import current_app
+
+# SQLite file shared by all workers on this host; anchored to the project, not the
+# working directory, so every worker finds the same store
+DEFAULT_REVOCATION_DB = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'revoked_tokens.db'
+)
+
+
+# Millisecond issue time added to every token; 'iat' is whole seconds, so on its own it
+# cannot tell a login right after a revoke-all from a token issued just before it
+ISSUED_AT_CLAIM = 'iat_ms'
+
+
+def issued_at_claim():
+    """Claims for a token issued now (see ISSUED_AT_CLAIM)"""
+    return {ISSUED_AT_CLAIM: int(time.time() * 1000)}
+
+
+def _issued_at(payload):
+    """When a decoded token was issued, in seconds"""
+    if ISSUED_AT_CLAIM in payload:
+        return payload[ISSUED_AT_CLAIM] / 1000
+    # Tokens from before the claim existed only have whole seconds, so one issued in the
+    # same second as a revoke-all counts as revoked
+    return payload.get('iat', 0)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (no false negatives, rare false positives)"""
+
+    def __init__(self, capacity=100000, error_rate=0.001):
+        self.capacity = max(1, int(capacity))
+        self.error_rate = error_rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], 'little')
+        b = int.from_bytes(digest[8:], 'little') | 1
+        return [(a + i * b) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationStore:
+    """Revoked JTIs and per-user cut-offs, persisted in SQLite with a Bloom filter in front"""
+
+    def __init__(self, path=DEFAULT_REVOCATION_DB, capacity=100000, error_rate=0.001,
+                 sync_seconds=1.0, purge_seconds=3600.0):
+        self.path = path
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_seconds = sync_seconds
+        self.purge_seconds = purge_seconds
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._cutoffs = {}      # user ID -> tokens issued at or before this time are revoked
+        self._last_row = 0      # highest revocation row folded into the filter and cut-offs
+        self._next_sync = 0.0
+        self._next_purge = time.time() + purge_seconds
+        self.checks = 0
+        self.store_lookups = 0
+        self.false_positives = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS revocations ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, key TEXT NOT NULL, '
+                'revoked_at REAL NOT NULL, expires_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS revocations_key ON revocations (kind, key)')
+        finally:
+            conn.close()
+        self._rebuild()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            path=os.getenv('TOKEN_REVOCATION_DB', DEFAULT_REVOCATION_DB),
+            capacity=int(os.getenv('TOKEN_REVOCATION_CAPACITY', '100000')),
+            sync_seconds=float(os.getenv('TOKEN_REVOCATION_SYNC_SECONDS', '1'))
+        )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def _apply(self, kind, key, revoked_at):
+        if kind == 'jti':
+            # Rows this process wrote come back on the next sync; don't count them twice
+            if key not in self._bloom:
+                self._bloom.add(key)
+        else:
+            self._cutoffs[key] = max(self._cutoffs.get(key, 0), revoked_at)
+
+    def _fold(self, rows):
+        """Add revocation rows (id, kind, key, revoked_at) to the in-memory state"""
+        for row_id, kind, key, revoked_at in rows:
+            self._apply(kind, key, revoked_at)
+            self._last_row = max(self._last_row, row_id)
+
+    def _rebuild(self):
+        """Drop expired rows and rebuild the filter from the live ones (a Bloom filter
+        cannot forget, so this is how expired JTIs leave it)"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute('DELETE FROM revocations WHERE expires_at <= ?', (now,))
+            rows = conn.execute(
+                'SELECT id, kind, key, revoked_at FROM revocations ORDER BY id'
+            ).fetchall()
+        finally:
+            conn.close()
+        live_jtis = sum(1 for row in rows if row[1] == 'jti')
+        self._bloom = BloomFilter(max(self.capacity, live_jtis * 2), self.error_rate)
+        self._cutoffs = {}
+        self._fold(rows)
+        self._next_sync = now + self.sync_seconds
+        self._next_purge = now + self.purge_seconds
+
+    def _sync(self):
+        """Pick up revocations written by other processes; caller holds the lock"""
+        now = time.time()
+        if now >= self._next_purge or self._bloom.count > self._bloom.capacity:
+            self._rebuild()
+            return
+        if now < self._next_sync:
+            return
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                'SELECT id, kind, key, revoked_at FROM revocations WHERE id > ? ORDER BY id',
+                (self._last_row,)
+            ).fetchall()
+        finally:
+            conn.close()
+        self._fold(rows)
+        self._next_sync = now + self.sync_seconds
+
+    def _insert(self, kind, key, expires_at):
+        revoked_at = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                'INSERT INTO revocations (kind, key, revoked_at, expires_at) VALUES (?, ?, ?, ?)',
+                (kind, key, revoked_at, expires_at)
+            )
+        finally:
+            conn.close()
+        # Effective in this process at once; other processes see it on their next sync.
+        # _last_row is left alone so rows other processes wrote before this one aren't skipped
+        with self._lock:
+            self._apply(kind, key, revoked_at)
+
+    def revoke(self, jti, expires_at):
+        """Revoke one token until its expiry (the 'exp' claim)"""
+        if expires_at and expires_at > time.time():
+            self._insert('jti', jti, float(expires_at))
+
+    def revoke_user(self, user_id, ttl_seconds):
+        """Revoke every token issued to a user so far. ttl_seconds is the longest token
+        lifetime; after that every token the cut-off covers has expired by itself."""
+        self._insert('user', str(user_id), time.time() + ttl_seconds)
+
+    def is_revoked(self, payload):
+        """True if a decoded token was revoked on its own or by a revoke-all for its user"""
+        jti = payload.get('jti')
+        with self._lock:
+            self.checks += 1
+            self._sync()
+            cutoff = self._cutoffs.get(str(payload.get('sub')))
+            if cutoff is not None and _issued_at(payload) <= cutoff:
+                return True
+            if not jti or jti not in self._bloom:
+                return False
+            self.store_lookups += 1
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT 1 FROM revocations WHERE kind = 'jti' AND key = ? AND expires_at > ?",
+                (jti, time.time())
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            with self._lock:
+                self.false_positives += 1
+        return row is not None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'filter_entries': self._bloom.count,
+                'revoked_users': len(self._cutoffs),
+                'filter_bits': self._bloom.size,
+                'checks': self.checks,
+                'store_lookups': self.store_lookups,
+                'false_positives': self.false_positives
+            }
+
+
+_store = {'instance': None, 'pid': None}
+_store_lock = threading.Lock()
+
+
+def get_revocation_store():
+    """The revocation store for this process (each forked worker builds its own filter)"""
+    with _store_lock:
+        if _store['instance'] is None or _store['pid'] != os.getpid():
+            _store['instance'] = RevocationStore.from_env()
+            _store['pid'] = os.getpid()
+        return _store['instance']
+
+
+def revoke_user_tokens(user_id):
+    """Sign a user out everywhere: revoke every token issued to them so far"""
+    config = current_app.config
+    lifetime = max(config['JWT_ACCESS_TOKEN_EXPIRES'], config['JWT_REFRESH_TOKEN_EXPIRES'])
+    get_revocation_store().revoke_user(user_id, lifetime.total_seconds())
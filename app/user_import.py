@@ -0,0 +1,179 @@
+"""
+Bulk user import
+Streams users from CSV or JSON Lines, checks email and Student ID uniqueness
+against one snapshot of the Users sheet, hashes passwords in parallel and
+writes accepted users in large batched appends, reporting errors per row.
+"""
+import codecs
+import csv
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from app.password_hashing import HashingBusy, get_hasher
+from app.quota_scheduler import get_scheduler
+
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '500'))
+# Passwords handed to the hashing pool at once
+IMPORT_HASH_WORKERS = int(os.getenv('IMPORT_HASH_WORKERS', '4'))
+# Rows one POST /api/users/import request handles, so hashing fits in the worker
+# timeout; the report's next_line says where to resume (the CLI has no cap)
+IMPORT_MAX_ROWS = int(os.getenv('IMPORT_MAX_ROWS', '200'))
+
+ROLES = ('student', 'admin')
+_EMAIL = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+# Accepted column names -> add_user() field
+_FIELDS = {
+    'full_name': 'name', 'name': 'name', 'full name': 'name',
+    'email': 'email',
+    'student_id': 'student_id', 'student id': 'student_id',
+    'contact_number': 'phone', 'phone': 'phone', 'contact number': 'phone',
+    'password': 'password',
+    'section': 'section',
+    'role': 'role'
+}
+REQUIRED = ('name', 'email', 'student_id', 'password')
+
+
+def read_rows(stream, fmt):
+    """Yield (line number, raw dict) from a binary or text stream of CSV or JSON Lines"""
+    if fmt not in ('csv', 'jsonl'):
+        raise ValueError("format must be 'csv' or 'jsonl'")
+    lines = _text_lines(stream)
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+
+def _text_lines(stream):
+    """Lines of a stream, decoding bytes as UTF-8 (with or without a BOM) as they arrive"""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    pending = ''
+    for chunk in iter(lambda: stream.read(64 * 1024), b''):
+        if not chunk:
+            break
+        pending += decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        *lines, pending = pending.split('\n')
+        for line in lines:
+            yield line + '\n'
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
+
+
+def normalize(raw):
+    """add_user() fields from one input row, or (None, error)"""
+    if raw is None:
+        return None, 'Row is not a JSON object'
+    user = {}
+    for key, value in raw.items():
+        field = _FIELDS.get(str(key or '').strip().lower())
+        if field and value is not None:
+            user[field] = str(value).strip()
+    missing = [f for f in REQUIRED if not user.get(f)]
+    if missing:
+        return None, f"Missing required fields: {', '.join(missing)}"
+    if not _EMAIL.match(user['email']):
+        return None, 'Invalid email'
+    user['email'] = user['email'].lower()
+    user['role'] = (user.get('role') or 'student').lower()
+    if user['role'] not in ROLES:
+        return None, f"role must be one of {', '.join(ROLES)}"
+    user.setdefault('phone', '')
+    user.setdefault('section', '')
+    return user, None
+
+
+class UserImporter:
+    """Validates and writes one import; call run() with read_rows() output"""
+
+    def __init__(self, db, batch_size=IMPORT_BATCH_SIZE, hash_workers=IMPORT_HASH_WORKERS, dry_run=False,
+                 max_rows=None):
+        self.db = db
+        self.batch_size = max(1, batch_size)
+        self.hash_workers = max(1, hash_workers)
+        self.dry_run = dry_run
+        self.max_rows = max_rows
+        self.created = 0
+        self.errors = []    # [{'line', 'email', 'error'}]
+        self.rows = 0
+        self.next_line = None   # first line left unread when max_rows stopped the import
+
+    def run(self, rows):
+        """Import every row; returns the report"""
+        # One snapshot of existing users; rows accepted below are added to it as we go
+        existing = self.db.get_all_users()
+        emails = {str(u.get('Email', '')).strip().lower() for u in existing}
+        student_ids = {str(u.get('Student ID', '')).strip() for u in existing}
+        batch = []
+        with ThreadPoolExecutor(max_workers=self.hash_workers, thread_name_prefix='import-hash') as pool:
+            for line, raw in rows:
+                if self.max_rows is not None and self.rows >= self.max_rows:
+                    self.next_line = line
+                    break
+                self.rows += 1
+                user, error = normalize(raw)
+                if error is None and user['email'] in emails:
+                    error = 'Email already registered'
+                elif error is None and user['student_id'] in student_ids:
+                    error = 'Student ID already exists'
+                if error:
+                    self.errors.append({'line': line, 'email': (raw or {}).get('email'), 'error': error})
+                    continue
+                emails.add(user['email'])
+                student_ids.add(user['student_id'])
+                batch.append((line, user))
+                if len(batch) >= self.batch_size:
+                    self._write(pool, batch)
+                    batch = []
+            if batch:
+                self._write(pool, batch)
+        return self.report()
+
+    def _write(self, pool, batch):
+        """Hash one batch's passwords in parallel and write it with a single append.
+
+        A failure is reported against the batch's rows and the import moves on.
+        """
+        try:
+            hashes = pool.map(get_hasher().hash, [user['password'] for _, user in batch])
+            users = [dict(user, password=hashed) for (_, user), hashed in zip(batch, hashes)]
+            if self.dry_run:
+                self.created += len(users)
+                return
+            # Imports yield the quota to interactive requests
+            with get_scheduler().bulk():
+                created = self.db.add_users_bulk(users)
+            error = 'Failed to write user'
+        except HashingBusy as e:
+            created, error = None, f'Password hashing busy: {e}'
+        except Exception as e:
+            print(f"[ERROR] Import batch at line {batch[0][0]} failed: {e}")
+            created, error = None, f'Failed to write user: {e}'
+        if created:
+            self.created += len(created)
+            return
+        for line, user in batch:
+            self.errors.append({'line': line, 'email': user['email'], 'error': error})
+
+    def report(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'failed': len(self.errors),
+            'dry_run': self.dry_run,
+            'next_line': self.next_line,
+            'errors': self.errors
+        }
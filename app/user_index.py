@@ -0,0 +1,58 @@
+"""
+In-memory lookup indexes for the Users sheet
+Maps lowercase email, ID and Student ID to user records in O(1)
+"""
+
+
+def _key(value):
+    """Normalize an ID-like cell value for dictionary lookups"""
+    return str(value).strip()
+
+
+class UserIndex:
+    """Hash indexes over one version of the Users sheet"""
+
+    def __init__(self, records, version):
+        self.version = version
+        self.by_email = {}
+        self.by_id = {}
+        self.by_student_id = {}
+        self.positions = {}  # ID -> 0-based record position (sheet row = position + 2)
+        for position, record in enumerate(records):
+            self.add(record, position)
+
+    def add(self, record, position):
+        """Index a record; the first record wins on duplicate keys, like a scan would"""
+        email = str(record.get('Email', '')).strip().lower()
+        user_id = _key(record.get('ID', ''))
+        student_id = _key(record.get('Student ID', ''))
+        if email:
+            self.by_email.setdefault(email, record)
+        if user_id:
+            self.by_id.setdefault(user_id, record)
+            self.positions.setdefault(user_id, position)
+        if student_id:
+            self.by_student_id.setdefault(student_id, record)
+
+    def replace(self, old_record, new_record, position):
+        """Re-index a record after its fields were updated in place"""
+        for index, field in ((self.by_email, 'Email'), (self.by_id, 'ID'),
+                             (self.by_student_id, 'Student ID')):
+            value = old_record.get(field, '')
+            key = str(value).strip().lower() if field == 'Email' else _key(value)
+            if index.get(key) is old_record:
+                del index[key]
+        self.positions.pop(_key(old_record.get('ID', '')), None)
+        self.add(new_record, position)
+
+    def find_by_email(self, email):
+        return self.by_email.get(str(email).strip().lower())
+
+    def find_by_id(self, user_id):
+        return self.by_id.get(_key(user_id))
+
+    def find_by_student_id(self, student_id):
+        return self.by_student_id.get(_key(student_id))
+
+    def position_of(self, user_id):
+        return self.positions.get(_key(user_id))
@@ -8,6 +8,8 @@ from google.auth.transport.requests import Request
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 
+from app.quota_scheduler import get_scheduler
+
 class GoogleSheetsAPI:
     """Handle Google Sheets operations"""
     
@@ -16,6 +18,7 @@ class GoogleSheetsAPI:
         self.sheet_id = sheet_id or os.environ.get('GOOGLE_SHEET_ID')
         self.credentials_file = credentials_file or os.environ.get('GOOGLE_CREDENTIALS_FILE')
         self.service = None
+        self.scheduler = get_scheduler()
         
         if self.credentials_file and self.sheet_id:
             self.authenticate()
@@ -45,12 +48,13 @@ class GoogleSheetsAPI:
             ]]
             
             body = {'values': values}
-            result = self.service.spreadsheets().values().append(
+            request = self.service.spreadsheets().values().append(
                 spreadsheetId=self.sheet_id,
                 range='Sheet1!A:D',
                 valueInputOption='USER_ENTERED',
                 body=body
-            ).execute()
+            )
+            result = self.scheduler.call(request.execute, kind='write')
             
             return True
         except Exception as e:
@@ -63,10 +67,11 @@ class GoogleSheetsAPI:
             return []
         
         try:
-            result = self.service.spreadsheets().values().get(
+            request = self.service.spreadsheets().values().get(
                 spreadsheetId=self.sheet_id,
                 range='Sheet1!A:D'
-            ).execute()
+            )
+            result = self.scheduler.call(request.execute, kind='read')
             
             return result.get('values', [])
         except Exception as e:
@@ -87,12 +92,13 @@ class GoogleSheetsAPI:
             ]]
             
             body = {'values': values}
-            result = self.service.spreadsheets().values().update(
+            request = self.service.spreadsheets().values().update(
                 spreadsheetId=self.sheet_id,
                 range=f'Sheet1!A{row}:D{row}',
                 valueInputOption='USER_ENTERED',
                 body=body
-            ).execute()
+            )
+            result = self.scheduler.call(request.execute, kind='write')
             
             return True
         except Exception as e:
@@ -0,0 +1,134 @@
+"""
+Write-behind batching for worksheet appends
+Coalesces rows queued by concurrent requests into one append_rows call per worksheet
+"""
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future
+
+_STOP = object()
+_UPDATED_RANGE = re.compile(r'!\$?[A-Z]+\$?(\d+)')
+
+
+def first_appended_row(response):
+    """Sheet row number of the first row written by an append call, if reported"""
+    updated_range = (response or {}).get('updates', {}).get('updatedRange', '')
+    match = _UPDATED_RANGE.search(updated_range)
+    return int(match.group(1)) if match else None
+
+
+class WorksheetWriter(threading.Thread):
+    """Background thread that flushes queued rows for a single worksheet"""
+
+    def __init__(self, worksheet, flush_interval, max_rows):
+        super().__init__(name=f"sheets-writer-{worksheet.title}", daemon=True)
+        self.worksheet = worksheet
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+        self.pending = queue.Queue()
+        self.batches = 0
+        self.rows_written = 0
+
+    def submit(self, row):
+        future = Future()
+        self.pending.put((row, future))
+        return future
+
+    def stop(self):
+        self.pending.put((_STOP, None))
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            item = self.pending.get()
+            if item[0] is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            # Collect until the batch is full or the flush interval has passed
+            while len(batch) < self.max_rows:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self.pending.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item[0] is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+        # Drain anything queued behind the stop marker
+        leftovers = []
+        while True:
+            try:
+                item = self.pending.get_nowait()
+            except queue.Empty:
+                break
+            if item[0] is not _STOP:
+                leftovers.append(item)
+        if leftovers:
+            self._flush(leftovers)
+
+    def _flush(self, batch):
+        rows = [row for row, _ in batch]
+        try:
+            response = self.worksheet.append_rows(rows)
+        except Exception as e:
+            print(f"[ERROR] Write-behind flush to {self.worksheet.title} failed: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.rows_written += len(rows)
+        first_row = first_appended_row(response)
+        for offset, (_, future) in enumerate(batch):
+            future.set_result(first_row + offset if first_row else None)
+
+
+class WriteBehindQueue:
+    """Per-worksheet writer threads for coalescing appends"""
+
+    def __init__(self, flush_interval=0.2, max_rows=50):
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+        self._writers = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def submit(self, worksheet, row):
+        """Queue a row for append; the Future resolves to its sheet row number"""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Write-behind queue is closed")
+            writer = self._writers.get(worksheet.title)
+            if writer is None:
+                writer = WorksheetWriter(worksheet, self.flush_interval, self.max_rows)
+                writer.start()
+                self._writers[worksheet.title] = writer
+        return writer.submit(row)
+
+    def close(self, timeout=30):
+        """Flush every pending row and stop the writer threads"""
+        with self._lock:
+            self._closed = True
+            writers = list(self._writers.values())
+            self._writers.clear()
+        for writer in writers:
+            writer.stop()
+        for writer in writers:
+            writer.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                title: {
+                    'pending': writer.pending.qsize(),
+                    'batches': writer.batches,
+                    'rows_written': writer.rows_written
+                }
+                for title, writer in self._writers.items()
+            }
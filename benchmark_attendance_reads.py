@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Sheets API calls made by get_user_attendance
+Compares the old per-subject loop with the batched read, for a growing number of subjects.
+Runs offline against the call-counting in-memory spreadsheet from app.memory_db.
+"""
+
+from app.google_sheets_db import GoogleSheetsDB
+from app.memory_db import create_spreadsheet, seed_spreadsheet
+
+
+def build_spreadsheet(subjects, students=60, days=30):
+    spreadsheet = seed_spreadsheet(create_spreadsheet(subjects), students, days, subjects)
+    spreadsheet.calls = 0
+    return spreadsheet
+
+
+def legacy_get_user_attendance(spreadsheet, subjects, user_id):
+    """The pre-batching algorithm: per subject, open + read the sheet and re-read Users"""
+    all_attendance = []
+    for subject in subjects:
+        records = spreadsheet.worksheet(subject).get_all_records()
+        users = spreadsheet.worksheet('Users').get_all_records()
+        student_id = next((u['Student ID'] for u in users if u.get('ID') == user_id), None)
+        all_attendance.extend(r for r in records if str(r.get('Student ID', '')) == str(student_id))
+    return all_attendance
+
+
+def main():
+    print("=" * 70)
+    print("get_user_attendance - Sheets API calls per request (cold cache)")
+    print("=" * 70)
+    print(f"{'subjects':>10} {'legacy':>10} {'batched':>10} {'rows':>8}")
+
+    for count in (4, 8, 16, 32):
+        subjects = [f'Subject{i}' for i in range(count)]
+
+        spreadsheet = build_spreadsheet(subjects)
+        legacy_rows = legacy_get_user_attendance(spreadsheet, subjects, 7)
+        legacy_calls = spreadsheet.calls
+
+        spreadsheet = build_spreadsheet(subjects)
+        db = GoogleSheetsDB(spreadsheet=spreadsheet)
+        db.ATTENDANCE_SUBJECTS = subjects
+        spreadsheet.calls = 0
+        rows = db.get_user_attendance(7)
+        batched_calls = spreadsheet.calls
+
+        assert len(rows) == len(legacy_rows)
+        print(f"{count:>10} {legacy_calls:>10} {batched_calls:>10} {len(rows):>8}")
+
+    print("\nLegacy cost grows with the number of subject sheets; batched stays constant.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark: login throughput with password checks on the request thread vs the hashing pool
+Fires a burst of concurrent logins at the in-memory backend while another thread keeps
+calling /api/health, and reports logins per second and the health-check latency seen
+during the burst (how much the hashing starves other endpoints).
+
+    python benchmark_login.py --logins 32 --concurrency 8
+"""
+
+import argparse
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ['STORAGE_BACKEND'] = 'memory'
+os.environ.setdefault('MEMORY_SEED_STUDENTS', '50')
+os.environ.setdefault('MEMORY_SEED_DAYS', '1')
+
+from run import app
+from app.password_hashing import get_hasher, reset_hasher
+
+
+def login(client, number):
+    response = client.post('/api/auth/login', json={
+        'email': f'student{number}@eduface.com',
+        'password': 'student123'
+    })
+    assert response.status_code == 200, response.get_json()
+
+
+def run_burst(workers, logins, concurrency):
+    """Logins per second and health-check latencies (ms) for one hashing setup"""
+    os.environ['PASSWORD_HASH_WORKERS'] = str(workers)
+    reset_hasher()
+    get_hasher().verify(get_hasher().hash('warm-up'), 'warm-up')  # start the pool outside the timing
+
+    latencies = []
+    done = threading.Event()
+
+    def probe():
+        client = app.test_client()
+        while not done.is_set():
+            started = time.perf_counter()
+            client.get('/api/health')
+            latencies.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.01)
+
+    prober = threading.Thread(target=probe, daemon=True)
+    prober.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        clients = [app.test_client() for _ in range(concurrency)]
+        list(pool.map(lambda i: login(clients[i % concurrency], i % 50 + 1), range(logins)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    prober.join()
+    return logins / elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--logins', type=int, default=32)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='hashing processes')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print(f"{args.logins} logins, {args.concurrency} concurrent, method {get_hasher().method}")
+    print("=" * 70)
+    print(f"{'hashing':>22} {'logins/s':>10} {'health p50':>12} {'health p95':>12}")
+
+    for label, workers in (('request thread', 0), (f'pool ({args.workers} procs)', args.workers)):
+        rate, latencies = run_burst(workers, args.logins, args.concurrency)
+        latencies.sort()
+        p50 = statistics.median(latencies) if latencies else 0.0
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0
+        print(f"{label:>22} {rate:>10.2f} {p50:>10.1f}ms {p95:>10.1f}ms")
+
+    reset_hasher()
+    print("\nThe pool row should scale with --workers on a multi-core host; health latency shows")
+    print("whether the login burst slows requests that never hash anything.")
+
+
+if __name__ == '__main__':
+    main()
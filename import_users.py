@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Bulk-import users (semester onboarding) from a CSV or JSON Lines file
+Columns: full_name, email, student_id, password, and optionally contact_number, section, role.
+Uses the backend selected by STORAGE_BACKEND, like the API server.
+
+    python import_users.py students.csv
+    python import_users.py students.jsonl --dry-run
+"""
+
+import argparse
+import json
+import sys
+
+from run import app
+from app.database import get_db
+from app.user_import import IMPORT_BATCH_SIZE, IMPORT_HASH_WORKERS, UserImporter, read_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk-import users from CSV or JSON Lines')
+    parser.add_argument('path', help="file to import, or '-' for stdin")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help='default: from the file extension')
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help='rows per append')
+    parser.add_argument('--hash-workers', type=int, default=IMPORT_HASH_WORKERS)
+    parser.add_argument('--dry-run', action='store_true', help='validate and hash only, write nothing')
+    args = parser.parse_args()
+
+    fmt = args.format or ('csv' if args.path.lower().endswith('.csv') else 'jsonl')
+    stream = sys.stdin.buffer if args.path == '-' else open(args.path, 'rb')
+    try:
+        with app.app_context():
+            importer = UserImporter(get_db(), args.batch_size, args.hash_workers, args.dry_run)
+            report = importer.run(read_rows(stream, fmt))
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+
+    for error in report['errors']:
+        print(f"line {error['line']}: {error['email'] or '-'}: {error['error']}")
+    summary = {k: v for k, v in report.items() if k != 'errors'}
+    print(json.dumps(summary))
+    return 0 if not report['errors'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -67,6 +67,10 @@ from flask import Flask
 from flask_cors import CORS
 
 from app import jwt
+from app import database
+from app.quota_scheduler import get_scheduler
+from app.password_hashing import get_hasher
+from app.token_revocation import get_revocation_store, issued_at_claim
 from app.routes import (
     auth_bp,
     users_bp,
@@ -95,17 +99,42 @@ def create_app():
         "JWT_SECRET_KEY", "jwt-secret-key-change-in-production"
     )
 
-    app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(days=30)
+    # Access tokens carry the user's role, so they are short-lived; clients renew
+    # them with the refresh token from /api/auth/refresh
+    app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(
+        minutes=int(os.environ.get("JWT_ACCESS_TOKEN_MINUTES", "15"))
+    )
+    app.config["JWT_REFRESH_TOKEN_EXPIRES"] = timedelta(
+        days=int(os.environ.get("JWT_REFRESH_TOKEN_DAYS", "30"))
+    )
+
+    # -------------------- Storage --------------------
+    # "sheets" (Google Sheets), "sql" (SQLAlchemy models on DATABASE_URL)
+    # or "memory" (seeded in-memory sheets for load tests)
+    app.config["STORAGE_BACKEND"] = os.environ.get("STORAGE_BACKEND", "sheets")
+
+    app.config["SHEETS_RECYCLE_CHECK_SECONDS"] = float(
+        os.environ.get("SHEETS_RECYCLE_CHECK_SECONDS", "30")
+    )
+    app.config["SHEETS_RECYCLE_GRACE_SECONDS"] = float(
+        os.environ.get("SHEETS_RECYCLE_GRACE_SECONDS", "60")
+    )
 
     # -------------------- CORS --------------------
     CORS(app, resources={r"/api/*": {"origins": "*"}})
 
     # -------------------- Extensions --------------------
     jwt.init_app(app)
+    database.init_app(app)
 
+    # Logout and forced sign-out; answered from memory unless the token looks revoked
     @jwt.token_in_blocklist_loader
     def check_if_token_revoked(jwt_header, jwt_payload):
-        return False
+        return get_revocation_store().is_revoked(jwt_payload)
+
+    @jwt.additional_claims_loader
+    def add_issued_at(identity):
+        return issued_at_claim()
 
     # -------------------- Blueprints --------------------
     app.register_blueprint(auth_bp, url_prefix="/api/auth")
@@ -119,6 +148,22 @@ def create_app():
     def health():
         return {"status": "ok", "message": "EDUFACE backend is running"}, 200
 
+    @app.route("/api/health/cache")
+    def cache_health():
+        return database.get_db().cache_stats(), 200
+
+    @app.route("/api/health/quota")
+    def quota_health():
+        return get_scheduler().stats(), 200
+
+    @app.route("/api/health/hashing")
+    def hashing_health():
+        return get_hasher().stats(), 200
+
+    @app.route("/api/health/revocation")
+    def revocation_health():
+        return get_revocation_store().stats(), 200
+
     return app
 
 